@@ -6,22 +6,28 @@ from dotenv import load_dotenv
 from discord.ext import commands
 import discord
 
+import metrics
+
 random.seed(time.time())
 load_dotenv()
 DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
 COMMAND_PREFIX = os.getenv('DISCORD_COMMAND_PREFIX')
 ANTI_GREETINGS = json.loads(os.getenv('ANTI_GREETINGS'))
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
 intents = discord.Intents.default()
 intents.members = True
 bot = commands.Bot(command_prefix='!', intents = intents)
+metrics.instrument_commands(bot)
 
 
 @bot.event
 async def on_ready():
+    await metrics.start(bot, METRICS_PORT)
     print(f'{bot.user.name} has connected to the server!')
 
 
 @bot.event
+@metrics.timed(metrics.EVENT_SECONDS.labels("member_join"))
 async def on_member_join(new_member):
     anti_greeting = random.choice(ANTI_GREETINGS).format(new_member.mention)
     channel = new_member.guild.system_channel
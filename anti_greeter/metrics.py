@@ -0,0 +1,298 @@
+import asyncio
+import functools
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# Counters, gauges and histograms in the Prometheus text format, served
+# over plain HTTP on a local port. Every value lives in a list or attribute
+# allocated when its label combination is first seen, so recording is a
+# bisect and an addition. Hot paths should look up their child with
+# labels() once and keep it.
+#
+# Copied into every bot; edit this one and run check_shared.py --sync.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Gauge(Counter):
+    __slots__ = ()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = bounds
+        # One slot per bucket plus +Inf, not cumulative until rendered.
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class Meter:
+    # Events over the last window seconds, kept in one slot per second.
+    __slots__ = ("slots", "second")
+
+    def __init__(self, window: int = 60) -> None:
+        self.slots = [0] * window
+        self.second = int(time.monotonic())
+
+    def advance(self) -> int:
+        now = int(time.monotonic())
+        if now - self.second >= len(self.slots):
+            self.slots[:] = [0] * len(self.slots)
+        else:
+            for second in range(self.second + 1, now + 1):
+                self.slots[second % len(self.slots)] = 0
+        self.second = now
+        return now
+
+    def mark(self, amount: int = 1) -> None:
+        self.slots[self.advance() % len(self.slots)] += amount
+
+    @property
+    def value(self) -> int:
+        self.advance()
+        return sum(self.slots)
+
+
+class Family:
+    # All children of one metric name, one per combination of label values.
+    kind: str
+    name: str
+    help: str
+    label_names: Tuple[str, ...]
+    children: Dict[Tuple[str, ...], object]
+
+    def __init__(self, kind: str, name: str, help: str, label_names: Sequence[str],
+                 factory: Callable[[], object]) -> None:
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.factory = factory
+        self.children = {}
+
+    def labels(self, *values) -> object:
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = self.factory()
+        return child
+
+
+def escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Registry:
+    families: List[Family]
+    functions: List[Tuple[str, str, Callable[[], float]]]
+
+    def __init__(self) -> None:
+        self.families = []
+        self.functions = []
+
+    def add(self, family: Family) -> Family:
+        self.families.append(family)
+        return family
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Family:
+        return self.add(Family("counter", name, help, labels, Counter))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Family:
+        return self.add(Family("gauge", name, help, labels, Gauge))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Family:
+        return self.add(Family("histogram", name, help, labels,
+                               lambda: Histogram(buckets)))
+
+    def meter(self, name: str, help: str, window: int = 60) -> Family:
+        return self.add(Family("gauge", name, help, (), lambda: Meter(window)))
+
+    def gauge_function(self, name: str, help: str, function: Callable[[], float]) -> None:
+        # Read when the metrics are scraped, for values that are already
+        # kept somewhere else.
+        self.functions.append((name, help, function))
+
+    def render(self) -> str:
+        lines = []
+
+        for family in self.families:
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+
+            for values, child in list(family.children.items()):
+                if isinstance(child, Histogram):
+                    total = 0
+                    for bound, count in zip(list(child.bounds) + ["+Inf"], child.counts):
+                        total += count
+                        labels = format_labels(family.label_names, values, f'le="{bound}"')
+                        lines.append(f"{family.name}_bucket{labels} {total}")
+                    labels = format_labels(family.label_names, values)
+                    lines.append(f"{family.name}_sum{labels} {child.sum}")
+                    lines.append(f"{family.name}_count{labels} {total}")
+                else:
+                    labels = format_labels(family.label_names, values)
+                    lines.append(f"{family.name}{labels} {child.value}")
+
+        for name, help, function in self.functions:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {function()}")
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+EVENT_SECONDS = REGISTRY.histogram("bot_event_seconds",
+                                   "Time spent handling each Discord event", ("event",))
+COMMAND_SECONDS = REGISTRY.histogram("bot_command_seconds",
+                                     "Time from a command arriving to its reply being sent",
+                                     ("command",))
+DISCORD_API_SECONDS = REGISTRY.histogram("discord_api_seconds",
+                                         "Latency of Discord HTTP API calls by route",
+                                         ("route",))
+DISCORD_API_ERRORS = REGISTRY.counter("discord_api_errors_total",
+                                      "Discord HTTP API calls that failed, by status",
+                                      ("route", "status"))
+LOOP_LAG = REGISTRY.histogram("event_loop_lag_seconds",
+                              "How late the event loop woke up a sleeping task")
+
+
+def timed(histogram: Histogram):
+    # For coroutine event handlers. functools.wraps keeps the name that
+    # discord.py registers the handler under.
+    def decorate(handler):
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await handler(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+def instrument_discord(client) -> None:
+    import discord
+
+    request = client.http.request
+    if getattr(request, "instrumented", False):
+        return
+
+    async def timed_request(route, **kwargs):
+        # The route path is the template, e.g. /channels/{channel_id}/messages,
+        # so there is one child per endpoint rather than per channel.
+        key = route.method + " " + route.path
+        started = time.perf_counter()
+        try:
+            return await request(route, **kwargs)
+        except discord.HTTPException as error:
+            DISCORD_API_ERRORS.labels(key, str(error.status)).inc()
+            raise
+        finally:
+            DISCORD_API_SECONDS.labels(key).observe(time.perf_counter() - started)
+
+    timed_request.instrumented = True
+    client.http.request = timed_request
+
+
+def instrument_commands(bot) -> None:
+    # For discord.ext.commands bots. Listeners are used rather than the
+    # invoke hooks so a bot can still set its own.
+    async def command_started(context) -> None:
+        context.metrics_started = time.perf_counter()
+
+    async def command_finished(context) -> None:
+        COMMAND_SECONDS.labels(context.command.qualified_name).observe(
+            time.perf_counter() - context.metrics_started)
+
+    bot.add_listener(command_started, "on_command")
+    bot.add_listener(command_finished, "on_command_completion")
+
+
+async def watch_loop_lag(interval: float = 0.25) -> None:
+    loop = asyncio.get_event_loop()
+    lag = LOOP_LAG.labels()
+
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag.observe(max(loop.time() - started - interval, 0.0))
+
+
+async def handle_scrape(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                        registry: Registry) -> None:
+    try:
+        request = (await reader.readline()).decode("latin-1").split()
+        while (await reader.readline()).strip():
+            pass
+
+        if len(request) >= 2 and request[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", registry.render().encode()
+        else:
+            status, body = "404 Not Found", b"Not found\n"
+
+        writer.write(f"HTTP/1.1 {status}\r\n"
+                     "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     "Connection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+serving = False
+
+
+async def start(client, port: Optional[int], host: str = "127.0.0.1",
+                registry: Registry = REGISTRY) -> None:
+    # Safe to call from every on_ready; only the first call does anything.
+    global serving
+    if serving:
+        return
+    serving = True
+
+    instrument_discord(client)
+    asyncio.ensure_future(watch_loop_lag())
+    if port:
+        await asyncio.start_server(lambda reader, writer: handle_scrape(reader, writer, registry),
+                                   host, port)
+        print(f"Metrics on http://{host}:{port}/metrics")
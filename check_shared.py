@@ -0,0 +1,55 @@
+import argparse
+import os
+import shutil
+import sys
+from typing import Dict, List
+
+
+# Each bot is deployed from its own directory with its own requirements, so
+# modules that several bots use are copied into each of them. The first
+# path of each entry is the one to edit; run with --sync to copy it over
+# the others. Without --sync, exits with an error if any copy differs.
+
+SHARED: Dict[str, List[str]] = {
+    "poker/utils/metrics.py": ["anti_greeter/metrics.py", "eco/metrics.py",
+                               "radio/metrics.py", "xp/metrics.py"],
+    "xp/rate_limit.py": ["eco/rate_limit.py"],
+    "xp/announcer.py": ["eco/announcer.py"],
+}
+
+
+def read(path: str) -> bytes:
+    try:
+        with open(path, "rb") as file:
+            return file.read()
+    except FileNotFoundError:
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check that the modules shared between "
+                                                 "bots are identical.")
+    parser.add_argument("--sync", action="store_true",
+                        help="copy each source over its copies instead of checking")
+    args = parser.parse_args()
+    root = os.path.dirname(os.path.abspath(__file__))
+
+    differ = []
+    for source, copies in SHARED.items():
+        expected = read(os.path.join(root, source))
+        for copy in copies:
+            if read(os.path.join(root, copy)) == expected:
+                continue
+            if args.sync:
+                shutil.copyfile(os.path.join(root, source), os.path.join(root, copy))
+                print(f"Copied {source} to {copy}")
+            else:
+                differ.append(copy)
+                print(f"{copy} differs from {source}")
+
+    print(f"{len(differ)} shared files out of date.")
+    return 1 if differ else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+class BalanceStore:
+    # All access goes through one worker thread, which owns the connection.
+    path: str
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="balance-store")
+        self.connection: sqlite3.Connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS balances ("
+                                    "guild_id INTEGER NOT NULL, "
+                                    "user_id INTEGER NOT NULL, "
+                                    "balance INTEGER NOT NULL, "
+                                    "PRIMARY KEY (guild_id, user_id)) WITHOUT ROWID")
+        return self.connection
+
+    def load_guild(self, guild_id: int) -> List[Tuple[int, int]]:
+        return self._connect().execute("SELECT user_id, balance FROM balances "
+                                       "WHERE guild_id = ?", (guild_id,)).fetchall()
+
+    def save_many(self, rows: Iterable[Tuple[int, int, int]]) -> None:
+        with self._connect() as connection:
+            connection.executemany("INSERT OR REPLACE INTO balances VALUES (?, ?, ?)", rows)
+
+    async def load_guild_async(self, guild_id: int) -> List[Tuple[int, int]]:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, self.load_guild, guild_id)
+
+
+class BalanceCache:
+    # Balances are kept in memory one dict per guild, loaded when the guild
+    # is first seen. The users paid since the last flush are written in one
+    # transaction on the store's thread every interval, so a crash loses at
+    # most one interval.
+    store: BalanceStore
+    guilds: Dict[int, Dict[int, int]]
+    pending: Set[Tuple[int, int]]
+
+    def __init__(self, store: BalanceStore, interval: float = 5.0) -> None:
+        self.store = store
+        self.interval = interval
+        self.guilds = {}
+        self.loading: Dict[int, asyncio.Future] = {}
+        self.pending = set()
+        # The users of the write running on the store's thread, if any.
+        self.writing: Set[Tuple[int, int]] = set()
+        self.task: asyncio.Task = None
+
+    async def guild(self, guild_id: int) -> Dict[int, int]:
+        balances = self.guilds.get(guild_id)
+        if balances is not None:
+            return balances
+
+        # Messages arriving while a guild loads wait for the same query.
+        if guild_id not in self.loading:
+            self.loading[guild_id] = asyncio.ensure_future(self.store.load_guild_async(guild_id))
+        try:
+            rows = await asyncio.shield(self.loading[guild_id])
+        finally:
+            self.loading.pop(guild_id, None)
+
+        if guild_id not in self.guilds:
+            self.guilds[guild_id] = dict(rows)
+        return self.guilds[guild_id]
+
+    async def pay(self, guild_id: int, user_id: int, money: int) -> Tuple[int, int]:
+        # Returns the user's old and new balance.
+        balances = await self.guild(guild_id)
+        old = balances.get(user_id, 0)
+        balances[user_id] = old + money
+        self.pending.add((guild_id, user_id))
+        return old, old + money
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self.pending:
+            return
+
+        pending, self.pending = self.pending, set()
+        self.writing = pending
+        loop = asyncio.get_event_loop()
+        try:
+            await loop.run_in_executor(self.store.executor, self.store.save_many,
+                                       self.rows(pending))
+        except Exception as error:
+            # Anything but a crash of this loop, which would stop saving for good.
+            print(f"Failed to save balances for {len(pending)} users: {error!r}")
+            self.pending |= pending
+        finally:
+            self.writing = set()
+
+    def rows(self, keys: Iterable[Tuple[int, int]]) -> List[Tuple[int, int, int]]:
+        # Read on the event loop, so the batch is consistent.
+        return [(guild_id, user_id, self.guilds[guild_id][user_id])
+                for guild_id, user_id in keys]
+
+    def close(self) -> None:
+        # Writes what is left once the event loop has stopped, after any
+        # write still running on the store's thread. That write's users are
+        # written again, since with the loop stopped nothing would put them
+        # back if it failed.
+        self.store.executor.shutdown()
+        keys = self.pending | self.writing
+        if keys:
+            self.store.save_many(self.rows(keys))
+            self.pending = set()
+            self.writing = set()
@@ -1,29 +1,91 @@
 import os
 import discord
 import random
+from bisect import bisect_right
 from dotenv import load_dotenv
+from typing import Optional
+
+import metrics
+from announcer import Announcer
+from balance_store import BalanceCache, BalanceStore
+from rate_limit import RateLimiter
 
 
 load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+ECO_DB = os.getenv("ECO_DB", "eco.db")
+# Seconds between writes of the balances that changed.
+FLUSH_INTERVAL = float(os.getenv("FLUSH_INTERVAL", 5))
+# Each user gets AWARD_BURST awards in a row, then one every AWARD_INTERVAL
+# seconds. Other messages are ignored.
+AWARD_INTERVAL = float(os.getenv("AWARD_INTERVAL", 60))
+AWARD_BURST = int(os.getenv("AWARD_BURST", 1))
+# With AGGREGATE on, awards are kept quietly and only milestones are
+# announced, at most once per channel every ANNOUNCE_INTERVAL seconds.
+# AGGREGATE=0 answers every award. Messages are only deleted with
+# DELETE_MESSAGES=1.
+AGGREGATE = bool(int(os.getenv("AGGREGATE", 1)))
+ANNOUNCE_INTERVAL = float(os.getenv("ANNOUNCE_INTERVAL", 30))
+DELETE_MESSAGES = bool(int(os.getenv("DELETE_MESSAGES", 0)))
+# 100, 250, 500, 1000, 2500, ...
+MILESTONES = [int(step * 10 ** power) for power in range(2, 13) for step in (1, 2.5, 5)]
 
 client = discord.Client()
+rate_limiter = RateLimiter(AWARD_INTERVAL, AWARD_BURST)
+announcer = Announcer(ANNOUNCE_INTERVAL)
+balances = BalanceCache(BalanceStore(ECO_DB), FLUSH_INTERVAL)
+rate_limited = metrics.REGISTRY.counter("bot_rate_limited_total",
+                                        "Messages ignored by the rate limiter").labels()
+metrics.REGISTRY.gauge_function("bot_announcements_sent",
+                                "Announcement messages sent since the start",
+                                lambda: announcer.sent)
 
 @client.event
 async def on_ready():
+    await metrics.start(client, METRICS_PORT)
+    balances.start()
     print("Eco bot ready!")
 
 @client.event
+@metrics.timed(metrics.EVENT_SECONDS.labels("message"))
 async def on_message(message):
     channel = message.channel
 
-    if message.author != client.user:
-        embed = discord.Embed(
-            description=str(get_money()),
-            color=0x00ff00
-        )
+    if message.author == client.user:
+        return
+    # Direct messages are limited as if they came from guild 0.
+    guild_id = message.guild.id if message.guild else 0
+    if not rate_limiter.allow(guild_id, message.author.id):
+        rate_limited.inc()
+        return
+
+    money = get_money()
+    old, new = await balances.pay(guild_id, message.author.id, money)
+    milestone = milestone_passed(old, new)
+
+    if AGGREGATE:
+        if milestone:
+            announcer.announce(channel, f"{message.author.mention} has earned "
+                                        f"{milestone:,} coins!")
+        return
+
+    description = str(money)
+    if milestone:
+        description += f"\n{message.author.display_name} has earned {milestone:,} coins!"
+    embed = discord.Embed(
+        description=description,
+        color=0x00ff00
+    )
+    if DELETE_MESSAGES:
         await message.delete()
-        await channel.send(embed=embed, delete_after=20)
+    await channel.send(embed=embed, delete_after=20)
+
+def milestone_passed(old: int, new: int) -> Optional[int]:
+    index = bisect_right(MILESTONES, new)
+    if index and MILESTONES[index - 1] > old:
+        return MILESTONES[index - 1]
+    return None
 
 def get_multiplier() -> int:
     multiplier = 1
@@ -42,3 +104,4 @@ def get_money() -> int:
     return get_multiplier() * random.randrange(1, 30, 1)
 
 client.run(DISCORD_TOKEN)
+balances.close()
\ No newline at end of file
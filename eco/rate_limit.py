@@ -0,0 +1,142 @@
+import time
+from array import array
+from typing import Tuple
+
+# Copied into the eco bot; edit this one and run check_shared.py --sync.
+
+
+# Slots of the old table moved to the new one on each call while the table
+# is rebuilt.
+REBUILD_STEP = 8
+# Marks a bucket of the old table that was moved ahead of the rebuild.
+MOVED = -1.0
+
+
+class RateLimiter:
+    # A token bucket per guild and user, stored as the time it will next be
+    # full (GCRA): a message is allowed while that is at most
+    # interval * (burst - 1) ahead of now, and pushes it interval further.
+    #
+    # Buckets live in an open addressing table of three flat arrays, 24
+    # bytes a slot. A bucket that has filled up again is the same as no
+    # bucket, so its slot is reused in place, and dropped when the table is
+    # rebuilt. The table only grows with the users who were limited recently.
+    #
+    # A rebuild moves REBUILD_STEP slots of the old table per call, so no
+    # message waits for the whole table. Until it is done, a user not found
+    # in the new table has their bucket moved over from the old one.
+    interval: float
+    burst: int
+
+    def __init__(self, interval: float, burst: int = 1, capacity: int = 1024) -> None:
+        self.interval = interval
+        self.burst = burst
+        self.tolerance = interval * (burst - 1)
+        self.old: Tuple[array, array, array] = None
+        self.old_left = 0
+        self.moved = 0
+        self.allocate(capacity)
+
+    def allocate(self, capacity: int) -> None:
+        self.mask = capacity - 1
+        self.guilds = array("Q", bytes(8 * capacity))
+        # 0 marks an empty slot; no Discord user has that id.
+        self.users = array("Q", bytes(8 * capacity))
+        self.full_at = array("d", bytes(8 * capacity))
+        self.used = 0
+
+    def __len__(self) -> int:
+        # Buckets held; one that has filled up again counts until its slot
+        # is reused or the table is rebuilt.
+        return self.used + self.old_left
+
+    def allow(self, guild_id: int, user_id: int, now: float = None) -> bool:
+        now = time.monotonic() if now is None else now
+        if self.old is not None:
+            self.rebuild_step(now)
+
+        index = hash((guild_id, user_id)) & self.mask
+        free = -1
+
+        while self.users[index]:
+            if self.users[index] == user_id and self.guilds[index] == guild_id:
+                return self.spend(index, now)
+            if free < 0 and self.full_at[index] <= now:
+                free = index
+            index = (index + 1) & self.mask
+
+        # A user without a bucket has a full one.
+        full_at = now
+        if self.old is not None:
+            full_at = max(self.take(guild_id, user_id), now)
+        if free < 0:
+            free = index
+            self.used += 1
+        self.guilds[free] = guild_id
+        self.users[free] = user_id
+        self.full_at[free] = full_at
+        allowed = self.spend(free, now)
+
+        if self.old is None and self.used * 4 > (self.mask + 1) * 3:
+            self.rebuild(2 * (self.mask + 1))
+        return allowed
+
+    def spend(self, index: int, now: float) -> bool:
+        full_at = max(self.full_at[index], now)
+        if full_at - now > self.tolerance:
+            return False
+        self.full_at[index] = full_at + self.interval
+        return True
+
+    def insert(self, guild_id: int, user_id: int, full_at: float) -> None:
+        index = hash((guild_id, user_id)) & self.mask
+        while self.users[index]:
+            index = (index + 1) & self.mask
+        self.guilds[index] = guild_id
+        self.users[index] = user_id
+        self.full_at[index] = full_at
+        self.used += 1
+
+    def rebuild(self, capacity: int) -> None:
+        self.old = (self.guilds, self.users, self.full_at)
+        self.old_left = self.used
+        self.moved = 0
+        self.allocate(capacity)
+
+    def rebuild_step(self, now: float) -> None:
+        # Keeps the buckets that are still filling up.
+        guilds, users, full_at = self.old
+        end = min(self.moved + REBUILD_STEP, len(users))
+        for index in range(self.moved, end):
+            if users[index] and full_at[index] != MOVED:
+                self.old_left -= 1
+                if full_at[index] > now:
+                    self.insert(guilds[index], users[index], full_at[index])
+        self.moved = end
+
+        if end == len(users):
+            self.old = None
+            # Halved once the users of a busy spell have moved on, which
+            # leaves the new table at most half full by the end of its own
+            # rebuild.
+            capacity = self.mask + 1
+            if capacity > 1024 and self.used * 8 < capacity:
+                self.rebuild(capacity // 2)
+
+    def take(self, guild_id: int, user_id: int) -> float:
+        # The time the user's bucket in the old table is full, or 0 if there
+        # is none left to move. Its slot stays taken, so the probes past it
+        # still find the buckets after it.
+        guilds, users, full_at = self.old
+        mask = len(users) - 1
+        index = hash((guild_id, user_id)) & mask
+
+        while users[index]:
+            if users[index] == user_id and guilds[index] == guild_id:
+                if index < self.moved or full_at[index] == MOVED:
+                    return 0.0
+                self.old_left -= 1
+                taken, full_at[index] = full_at[index], MOVED
+                return taken
+            index = (index + 1) & mask
+        return 0.0
@@ -0,0 +1,199 @@
+import argparse
+import json
+import platform
+import random
+import time
+from typing import Callable, Dict, List
+
+from models.card import Card
+from models.game import Game
+from models.hand import Hand
+from models.player import Player
+from models.pot_manager import PotManager
+from utils.batch_evaluator import card_ids, evaluate_batch
+from utils.game_constants import GameState
+from utils.hand_utils import get_best_possible_hand, get_best_strength
+from utils.poker_constants import RANKS, SUITS
+from utils.simulation import SimulatedUser
+
+
+# Offline benchmarks for the poker engine. Every case runs without a Discord
+# connection and the results are printed (or written) as JSON, so two runs
+# can be compared with any JSON diff tool.
+
+def time_case(run: Callable[[], int], repeat: int) -> Dict[str, float]:
+    best = None
+    operations = 0
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        operations = run()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    return {
+        "operations": operations,
+        "seconds": best,
+        "per_second": operations / best if best else None,
+        "mean_us": best / operations * 1e6 if operations else None,
+    }
+
+
+def random_hands(rng: random.Random, count: int, size: int) -> List[List[Card]]:
+    deck = [Card(suit, rank) for suit in SUITS for rank in RANKS]
+    return [rng.sample(deck, size) for _ in range(count)]
+
+
+def bench_hand_construction(hands: List[List[Card]]) -> Callable[[], int]:
+    def run() -> int:
+        for cards in hands:
+            Hand(cards)
+        return len(hands)
+    return run
+
+
+def bench_hand_comparison(hands: List[List[Card]]) -> Callable[[], int]:
+    built = [Hand(cards) for cards in hands]
+
+    def run() -> int:
+        for first, second in zip(built, built[1:]):
+            first < second
+            first == second
+        return len(built) - 1
+    return run
+
+
+def bench_best_possible_hand(hands: List[List[Card]]) -> Callable[[], int]:
+    def run() -> int:
+        for cards in hands:
+            get_best_possible_hand(cards[:5], tuple(cards[5:]))
+        return len(hands)
+    return run
+
+
+def bench_best_strength(hands: List[List[Card]]) -> Callable[[], int]:
+    def run() -> int:
+        for cards in hands:
+            get_best_strength(cards[:5], tuple(cards[5:]))
+        return len(hands)
+    return run
+
+
+def bench_batch_evaluation(hands: List[List[Card]]) -> Callable[[], int]:
+    ids = card_ids(hands)
+
+    def run() -> int:
+        evaluate_batch(ids)
+        return len(ids)
+    return run
+
+
+def bench_side_pots(players: int, rounds: int) -> Callable[[], int]:
+    # Every player has a different stack and shoves in turn, so each raise
+    # opens another side pot. The bets only update counters; the side pots
+    # are built when they are read, as at a showdown, so they are read at
+    # the end of each round.
+    def run() -> int:
+        actions = 0
+        for _ in range(rounds):
+            seated = [Player(SimulatedUser(i)) for i in range(players)]
+            for i, player in enumerate(seated):
+                player.balance = 100 * (i + 1)
+
+            pot = PotManager()
+            pot.new_hand(seated)
+            for player in seated:
+                pot.increase_bet(player.max_bet)
+                pot.handle_call(player)
+                actions += 1
+            for player in seated[:-1]:
+                pot.handle_call(player)
+                actions += 1
+            pot.pots
+        return actions
+    return run
+
+
+def play_hand(game: Game, rng: random.Random) -> None:
+    game.deal_hands(rng.getrandbits(128))
+
+    while game.state not in (GameState.NO_HANDS, GameState.NO_GAME):
+        player = game.current_player
+        if player.current_bet == game.current_bet:
+            game.check()
+        elif rng.random() < 0.1 and player.max_bet > game.current_bet:
+            game.all_in()
+        elif player.max_bet > game.current_bet:
+            game.call()
+        else:
+            game.all_in()
+
+
+def bench_full_hands(players: int, hands: int, seed: int) -> Callable[[], int]:
+    def run() -> int:
+        rng = random.Random(seed)
+        played = 0
+        game = None
+
+        while played < hands:
+            if game is None or game.state == GameState.NO_GAME:
+                game = Game()
+                for i in range(players):
+                    game.add_player(SimulatedUser(i))
+                game.start()
+            play_hand(game, rng)
+            played += 1
+        return played
+    return run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the poker engine.")
+    parser.add_argument("--hands", type=int, default=20000,
+                        help="random hands per evaluation case")
+    parser.add_argument("--games", type=int, default=2000,
+                        help="simulated hands for the full hand case")
+    parser.add_argument("--players", type=int, default=9)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", action="append", default=[],
+                        help="run only the named case, may be repeated")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    five_card_hands = random_hands(rng, args.hands, 5)
+    seven_card_hands = random_hands(rng, args.hands, 7)
+
+    cases = {
+        "hand_construction": bench_hand_construction(five_card_hands),
+        "hand_comparison": bench_hand_comparison(five_card_hands),
+        "get_best_possible_hand": bench_best_possible_hand(seven_card_hands[:args.hands // 10]),
+        "get_best_strength": bench_best_strength(seven_card_hands),
+        "batch_evaluation": bench_batch_evaluation(seven_card_hands),
+        "side_pots": bench_side_pots(args.players, args.hands // 100),
+        "full_hands": bench_full_hands(args.players, args.games, args.seed),
+    }
+
+    results = {}
+    for name, run in cases.items():
+        if not args.only or name in args.only:
+            results[name] = time_case(run, args.repeat)
+
+    report = json.dumps({
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "arguments": vars(args),
+        "results": results,
+    }, indent=2)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
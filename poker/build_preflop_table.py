@@ -0,0 +1,99 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from utils.batch_evaluator import evaluate_batch
+from utils.preflop import (EQUITY_SCALE, HAND_CLASSES, HEADER, MAGIC, TABLE_PATH, VERSION,
+                           class_combos)
+
+
+# Builds the preflop equity table read by utils/preflop.py. Each entry is
+# a Monte Carlo estimate over random boards (and random opponent hands for
+# the multiway columns), so more samples give a finer table.
+
+def deal_remaining(rng: np.random.Generator, used: np.ndarray, count: int) -> np.ndarray:
+    keys = rng.random((len(used), 52))
+    np.put_along_axis(keys, used, 2.0, axis=1)
+    return np.argpartition(keys, count, axis=1)[:, :count]
+
+
+def pot_shares(strengths: np.ndarray) -> np.ndarray:
+    best = strengths.max(axis=0)
+    leaders = (strengths == best).sum(axis=0)
+    return np.where(strengths[0] == best, 1 / leaders, 0.0)
+
+
+def heads_up_equity(rng: np.random.Generator, index: int, other_index: int,
+                    samples: int) -> float:
+    matchups = np.array([first + second
+                         for first in class_combos(index)
+                         for second in class_combos(other_index)
+                         if not set(first) & set(second)])
+    holes = matchups[rng.integers(len(matchups), size=samples)]
+    board = deal_remaining(rng, holes, 5)
+
+    strengths = evaluate_batch(np.vstack([np.hstack([holes[:, :2], board]),
+                                          np.hstack([holes[:, 2:], board])]))
+    return float(pot_shares(strengths.reshape(2, samples)).mean())
+
+
+def multiway_equity(rng: np.random.Generator, index: int, opponents: int,
+                    samples: int) -> float:
+    combos = np.array(class_combos(index))
+    holes = combos[rng.integers(len(combos), size=samples)]
+    dealt = deal_remaining(rng, holes, 5 + 2 * opponents)
+    board = dealt[:, :5]
+
+    hands = [np.hstack([holes, board])]
+    for opponent in range(opponents):
+        hands.append(np.hstack([dealt[:, 5 + 2 * opponent:7 + 2 * opponent], board]))
+
+    strengths = evaluate_batch(np.vstack(hands)).reshape(opponents + 1, samples)
+    return float(pot_shares(strengths).mean())
+
+
+def to_fixed(equity: float) -> int:
+    return int(round(min(max(equity, 0.0), 1.0) * EQUITY_SCALE))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the preflop equity table.")
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--max-opponents", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default=TABLE_PATH)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    started = time.time()
+
+    heads_up = np.zeros((HAND_CLASSES, HAND_CLASSES), dtype="<u2")
+    for index in range(HAND_CLASSES):
+        for other_index in range(index, HAND_CLASSES):
+            # A class against itself is a coin flip by symmetry.
+            if index == other_index:
+                equity = 0.5
+            else:
+                equity = heads_up_equity(rng, index, other_index, args.samples)
+            heads_up[index, other_index] = to_fixed(equity)
+            heads_up[other_index, index] = to_fixed(1 - equity)
+
+    multiway = np.zeros((HAND_CLASSES, args.max_opponents), dtype="<u2")
+    for index in range(HAND_CLASSES):
+        for opponents in range(1, args.max_opponents + 1):
+            multiway[index, opponents - 1] = to_fixed(
+                multiway_equity(rng, index, opponents, args.samples))
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, HAND_CLASSES, args.max_opponents, args.samples))
+        file.write(heads_up.tobytes())
+        file.write(multiway.tobytes())
+
+    print(f"Wrote {args.output} in {time.time() - started:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
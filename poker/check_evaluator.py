@@ -0,0 +1,91 @@
+import argparse
+import random
+import sys
+from typing import List
+
+from models.card import Card
+from models.hand import Hand
+from utils.card_encoding import ENCODED_CARDS
+from utils.evaluator import evaluate_five, evaluate_seven, seven_card_strength, strength_ranking
+from utils.hand_utils import get_best_hand, get_best_possible_hand
+from utils.poker_constants import RANKS, SUITS
+
+
+# Differential check of the native 7-card evaluator against the reference
+# implementation that builds a Hand for each of the 21 five-card subsets.
+
+def check_sample(table_cards: List[Card], player_cards: List[Card]) -> List[str]:
+    errors = []
+    reference = get_best_possible_hand(table_cards, tuple(player_cards))
+    strength, best_cards = get_best_hand(table_cards, tuple(player_cards))
+    cards = " ".join(str(card) for card in table_cards + player_cards)
+
+    picked = {card.id for card in best_cards}
+
+    if len(picked) != 5 or not picked <= {card.id for card in table_cards + player_cards}:
+        errors.append(f"{cards}: picked invalid cards {' '.join(map(str, best_cards))}")
+    elif Hand(best_cards) != reference:
+        errors.append(f"{cards}: got {Hand(best_cards)}, expected {reference}")
+    if strength_ranking(strength) != reference.rank:
+        errors.append(f"{cards}: strength ranked {strength_ranking(strength)}, "
+                      f"expected {reference.rank}")
+    if evaluate_five([card.encoded for card in best_cards]) != strength:
+        errors.append(f"{cards}: strength {strength} does not match its own cards")
+
+    return errors
+
+
+def check_batch(samples: int, rng: random.Random) -> List[str]:
+    from utils.batch_evaluator import evaluate_batch
+
+    hands = [rng.sample(range(52), 7) for _ in range(samples)]
+    errors = []
+
+    for hand, strength in zip(hands, evaluate_batch(hands).tolist()):
+        expected = seven_card_strength([ENCODED_CARDS[card_id] for card_id in hand])
+        if strength != expected:
+            errors.append(f"batch strength {strength} differs from {expected} "
+                          f"for card ids {hand}")
+
+    return errors
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare the native 7-card evaluator "
+                                                 "with get_best_possible_hand.")
+    parser.add_argument("--samples", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--batch", type=int, default=0,
+                        help="also compare evaluate_batch on this many random hands")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    deck = [Card(suit, rank) for suit in SUITS for rank in RANKS]
+    errors: List[str] = []
+    previous = None
+
+    for _ in range(args.samples):
+        cards = rng.sample(deck, 7)
+        errors += check_sample(cards[:5], cards[5:])
+
+        # Hands must also order the same way under both implementations.
+        current = (get_best_possible_hand(cards[:5], tuple(cards[5:])),
+                   evaluate_seven([card.encoded for card in cards])[0])
+        if previous is not None:
+            if (previous[0] < current[0]) != (previous[1] < current[1]) or \
+                    (previous[0] == current[0]) != (previous[1] == current[1]):
+                errors.append(f"ordering differs between {previous[0]} and {current[0]}")
+        previous = current
+
+    if args.batch:
+        errors += check_batch(args.batch, rng)
+
+    for error in errors[:20]:
+        print(error)
+    print(f"Checked {args.samples} hands, {len(errors)} mismatches.")
+
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
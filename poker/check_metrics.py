@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from typing import List
+
+from check_sharding import wait_for
+from stand_in_gateway import StandInGateway
+
+
+# Plays a hand to showdown against the stand-in gateway, starts a new game
+# at the same table and reads the metrics endpoint: the hand must be
+# counted and every command must still be answered.
+
+async def scrape(port: int) -> str:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    response = (await reader.read()).decode()
+    writer.close()
+    return response.split("\r\n\r\n", 1)[-1]
+
+
+def metric(text: str, name: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.split()[1])
+    return 0.0
+
+
+async def check(port: int, timeout: float) -> List[str]:
+    guild_id = 1 << 22
+    channel_id = guild_id + 1
+    gateway = StandInGateway({guild_id: [channel_id]}, 1)
+    await gateway.start()
+    errors: List[str] = []
+
+    directory = tempfile.mkdtemp()
+    env = dict(os.environ, DISCORD_TOKEN="stand-in", DISCORD_API=gateway.url,
+               POKER_DB=os.path.join(directory, "poker.db"),
+               POKER_LOG_DIR=os.path.join(directory, "hand_logs"),
+               METRICS_PORT=str(port), ODDS_WORKERS="1", PYTHONUNBUFFERED="1")
+    here = os.path.dirname(os.path.abspath(__file__))
+    bot = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(here, "poker_bot.py"),
+        cwd=here, env=env, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+    )
+
+    async def answered(user_id: int, content: str, expected: str) -> bool:
+        await gateway.say(guild_id, channel_id, user_id, content)
+        return await wait_for(lambda: any(expected in reply
+                                          for reply in gateway.replies(channel_id)), timeout)
+
+    try:
+        # The endpoint is started once the bot is ready.
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        while True:
+            try:
+                await scrape(port)
+                break
+            except OSError:
+                if loop.time() > deadline:
+                    return ["the bot did not start its metrics endpoint"]
+                await asyncio.sleep(0.2)
+
+        await answered(1, "!pkr-newgame", "new game")
+        await answered(2, "!pkr-join", "has joined")
+        await answered(1, "!pkr-start", "The game has begun!")
+        await answered(1, "!pkr-deal", "The hands have been dealt!")
+        # Only the player whose turn it is can go all in; the other is told
+        # to wait.
+        for user_id in (1, 2, 1, 2):
+            await gateway.say(guild_id, channel_id, user_id, "!pkr-all-in")
+        if not await wait_for(lambda: any("All cards will be revealed" in reply
+                                          for reply in gateway.replies(channel_id)), timeout):
+            errors.append("the hand did not reach a showdown")
+
+        replies = len(gateway.replies(channel_id))
+        await gateway.say(guild_id, channel_id, 1, "!pkr-newgame")
+        if not await wait_for(lambda: any("new game" in reply for reply
+                                          in gateway.replies(channel_id)[replies:]), timeout):
+            errors.append("!pkr-newgame after a showdown was not answered")
+
+        text = await scrape(port)
+        if metric(text, "poker_hands_total") != 1:
+            errors.append(f"poker_hands_total is {metric(text, 'poker_hands_total')}, not 1")
+        if metric(text, "poker_hand_evaluations_total") < 2:
+            errors.append("the showdown's hand evaluations were not counted")
+        if metric(text, "poker_table_queue_depth_count") < 8:
+            errors.append("the table queue depth of each command was not observed")
+        if "\npoker_table_queue_depth_max " not in text:
+            errors.append("the deepest table queue is not exported")
+        if "\npoker_tables_evicted " not in text:
+            errors.append("the table evictions are not exported")
+        if "\npoker_table_view_edits " not in text:
+            errors.append("the table view edits are not exported")
+    finally:
+        bot.terminate()
+        output = (await bot.stdout.read()).decode()
+        await bot.wait()
+        await gateway.stop()
+
+    if "Traceback" in output:
+        errors.append("the bot raised an exception:\n" + output)
+    return errors
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check the poker bot's metrics against the "
+                                                 "stand-in gateway.")
+    parser.add_argument("--port", type=int, default=9464)
+    parser.add_argument("--timeout", type=float, default=15)
+    args = parser.parse_args()
+
+    errors = asyncio.get_event_loop().run_until_complete(check(args.port, args.timeout))
+
+    for error in errors:
+        print(error)
+    print(f"{len(errors)} metrics errors.")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
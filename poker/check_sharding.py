@@ -0,0 +1,122 @@
+import argparse
+import asyncio
+import os
+import re
+import signal
+import sys
+import tempfile
+from typing import Dict, List
+
+from stand_in_gateway import StandInGateway
+from utils.sharding import shard_for_guild, worker_for_guild
+
+
+# End-to-end check of the sharded mode against the stand-in gateway: every
+# shard must identify, every guild's table must answer, and a killed worker
+# must come back and carry on with the tables it owned.
+
+async def wait_for(condition, timeout: float) -> bool:
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        if loop.time() > deadline:
+            return False
+        await asyncio.sleep(0.1)
+    return True
+
+
+async def read_pids(stream: asyncio.StreamReader, pids: Dict[int, int]) -> None:
+    while True:
+        line = (await stream.readline()).decode()
+        if not line:
+            return
+        print(f"  {line.rstrip()}")
+        started = re.match(r"Worker (\d+) started .*\(pid (\d+)\)", line)
+        if started:
+            pids[int(started.group(1))] = int(started.group(2))
+
+
+async def check(workers: int, shards: int, guilds: int, timeout: float) -> List[str]:
+    channels = {guild << 22: [(guild << 22) + 1] for guild in range(guilds)}
+    gateway = StandInGateway(channels, shards)
+    await gateway.start()
+    errors: List[str] = []
+
+    directory = tempfile.mkdtemp()
+    env = dict(os.environ, DISCORD_TOKEN="stand-in", DISCORD_API=gateway.url,
+               POKER_DB=os.path.join(directory, "poker.db"),
+               POKER_LOG_DIR=os.path.join(directory, "hand_logs"),
+               ODDS_WORKERS="1", PYTHONUNBUFFERED="1")
+    here = os.path.dirname(os.path.abspath(__file__))
+    supervisor = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(here, "supervisor.py"), "--workers", str(workers),
+        "--shards", str(shards), "--restart-delay", "0.5",
+        cwd=here, env=env, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+    )
+    pids: Dict[int, int] = {}
+    reader = asyncio.ensure_future(read_pids(supervisor.stdout, pids))
+
+    try:
+        # discord.py waits five seconds between the shards of one process.
+        if not await wait_for(lambda: len(gateway.sessions) == shards,
+                              timeout + 5 * shards / workers):
+            return [f"only shards {sorted(gateway.sessions)} of {shards} identified"]
+
+        for guild_id, (channel_id,) in channels.items():
+            await gateway.say(guild_id, channel_id, 1, "!pkr-newgame")
+        for guild_id, (channel_id,) in channels.items():
+            if not await wait_for(lambda: any("new game" in reply
+                                              for reply in gateway.replies(channel_id)),
+                                  timeout):
+                errors.append(f"guild {guild_id} on shard "
+                              f"{shard_for_guild(guild_id, shards)} did not answer")
+
+        # Kill the worker that owns the first guild and wait for its shards
+        # to identify again.
+        guild_id, (channel_id,) = next(iter(channels.items()))
+        worker = worker_for_guild(guild_id, workers, shards)
+        identified = len(gateway.identified)
+        os.kill(pids[worker], signal.SIGKILL)
+
+        if not await wait_for(lambda: len(gateway.identified) > identified and
+                              shard_for_guild(guild_id, shards) in gateway.sessions,
+                              timeout + 5 * shards / workers):
+            return errors + [f"worker {worker} was not restarted"]
+
+        # The table is restored from the store and the action log.
+        await gateway.say(guild_id, channel_id, 2, "!pkr-join")
+        if not await wait_for(lambda: any("has joined" in reply
+                                          for reply in gateway.replies(channel_id)),
+                              timeout):
+            errors.append(f"the table in guild {guild_id} was lost with its worker: "
+                          f"{gateway.replies(channel_id)[-1:]}")
+    finally:
+        supervisor.send_signal(signal.SIGTERM)
+        await supervisor.wait()
+        await reader
+        await gateway.stop()
+
+    return errors
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the sharded poker bot against the "
+                                                 "stand-in gateway.")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--guilds", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=15)
+    args = parser.parse_args()
+
+    errors = asyncio.get_event_loop().run_until_complete(
+        check(args.workers, args.shards, args.guilds, args.timeout)
+    )
+
+    for error in errors:
+        print(error)
+    print(f"{len(errors)} sharding errors.")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
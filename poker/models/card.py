@@ -1,30 +1,73 @@
-from functools import total_ordering
+from typing import List
 
-from utils.poker_constants import RANKS
+from utils.card_encoding import CARD_IDS, ENCODED_CARDS
+from utils.poker_constants import RANKS, SUITS
 
 
-@total_ordering
 class Card:
+    # There are exactly 52 Card instances, created once at import. Card(suit,
+    # rank) returns the shared instance, so cards compare equal only to
+    # themselves; use same_rank to compare ranks.
+    __slots__ = ("suit", "rank", "id", "encoded", "value", "name", "plural")
+
     suit: str
     rank: str
+    id: int
+    encoded: int
+    value: int
+    name: str
+    plural: str
+
+    def __new__(cls, suit: str, rank: str) -> "Card":
+        return CARDS[CARD_IDS[suit + rank]]
+
+    @classmethod
+    def _create(cls, suit: str, rank: str) -> "Card":
+        card = object.__new__(cls)
+        fields = {
+            "suit": suit,
+            "rank": rank,
+            "id": CARD_IDS[suit + rank],
+            "encoded": ENCODED_CARDS[CARD_IDS[suit + rank]],
+            "value": RANKS[rank].Value,
+            "name": RANKS[rank].Name,
+            "plural": RANKS[rank].Plural,
+        }
+        for field, value in fields.items():
+            object.__setattr__(card, field, value)
+        return card
+
+    def __setattr__(self, name, value) -> None:
+        raise AttributeError("Cards are immutable")
+
+    def __delattr__(self, name) -> None:
+        raise AttributeError("Cards are immutable")
 
-    def __init__(self, suit: str, rank: str) -> None:
-        self.suit = suit
-        self.rank = rank
+    def __reduce__(self):
+        return Card, (self.suit, self.rank)
 
     def __lt__(self, other) -> bool:
-        return RANKS[self.rank].Value < RANKS[other.rank].Value
+        return self.value < other.value
 
-    def __eq__(self, other) -> bool:
-        return self.rank == other.rank
+    def __le__(self, other) -> bool:
+        return self.value <= other.value
+
+    def __gt__(self, other) -> bool:
+        return self.value > other.value
+
+    def __ge__(self, other) -> bool:
+        return self.value >= other.value
+
+    def same_rank(self, other) -> bool:
+        return self.value == other.value
 
     def __str__(self) -> str:
         return self.suit + self.rank
 
-    @property
-    def name(self):
-        return RANKS[self.rank].Name
+    def __repr__(self) -> str:
+        return f"Card({self.suit!r}, {self.rank!r})"
+
 
-    @property
-    def plural(self):
-        return RANKS[self.rank].Plural
\ No newline at end of file
+# Indexed by card id.
+CARDS: List[Card] = sorted((Card._create(suit, rank) for suit in SUITS for rank in RANKS),
+                           key=lambda card: card.id)
@@ -1,16 +1,15 @@
 import random
-from typing import Set
+from typing import List
 
-from .card import Card
-from utils.poker_constants import RANKS, SUITS
+from .card import CARDS, Card
 
 
 class Deck:
-    cards: Set[Card]
+    cards: List[Card]
 
-    def __init__(self) -> None:
-        self.cards = [Card(suit, rank) for suit in SUITS for rank in RANKS]
-        random.shuffle(self.cards)
+    def __init__(self, seed: int = None) -> None:
+        self.cards = list(CARDS)
+        random.Random(seed).shuffle(self.cards)
 
     def draw(self) -> Card:
         return self.cards.pop()
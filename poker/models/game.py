@@ -1,12 +1,15 @@
-import discord
-from datetime import datetime, timedelta
-from typing import Dict, List
+import secrets
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
 from .card import Card
 from .deck import Deck
 from .player import Player
 from .pot_manager import PotManager
-from utils.game_constants import GAME_OPTIONS, GameState, Option
-from utils.hand_utils import get_best_possible_hand
+from .showdown import ShowdownEvaluator
+from utils.game_constants import GAME_OPTIONS, HAND_STATES, GameState, Option
+
+if TYPE_CHECKING:
+    import discord
 
 
 class Game:
@@ -20,12 +23,56 @@ class Game:
     table_cards: List[Card]
     pot: PotManager
     turn_index: int
-    last_raise: datetime
+    turn_deadline: float
+    blind_deadline: float
+    last_showdown: ShowdownEvaluator
+    recorder: Callable[[List], Tuple[int, int]]
+    log_seq: int
+    log_segment: int
+    log_offset: int
 
     def __init__(self) -> None:
+        self.recorder = None
+        self.clock: Optional[float] = None
+        self.log_seq = 0
+        self.log_segment = 0
+        self.log_offset = 0
         self.init_game()
         self.options = {key: value.Default for key, value in GAME_OPTIONS.items()}
 
+    def record(self, kind: str, *args) -> None:
+        # Every state change is passed to the recorder, if there is one, as
+        # [sequence number, kind, time, *arguments] so that it can be
+        # replayed.
+        if self.recorder is not None:
+            self.log_seq += 1
+            self.log_segment, self.log_offset = self.recorder(
+                [self.log_seq, kind, round(self.now(), 3), *args]
+            )
+
+    def now(self) -> float:
+        # While an event is replayed, the time it was recorded at, so the
+        # deadlines it sets come out as they were.
+        return time.time() if self.clock is None else self.clock
+
+    def new_game(self, user: "discord.User") -> None:
+        self.record("new", user.id, user.name)
+        self.init_game()
+        self.players.append(Player(user))
+        self.state = GameState.WAITING
+
+    def set_option(self, option: str, value: int) -> None:
+        self.record("set", option, value)
+        if option == "Raise-delay" and self.state not in (GameState.NO_GAME, GameState.WAITING):
+            # The new delay counts from when the blinds last went up, or from
+            # now if they were not going up at all.
+            if self.blind_deadline is None:
+                raised = self.now()
+            else:
+                raised = self.blind_deadline - self.options[option] * 60
+            self.blind_deadline = raised + value * 60 if value > 0 else None
+        self.options[option] = value
+
     def init_game(self) -> None:
         self.state = GameState.NO_GAME
         self.players = []
@@ -36,23 +83,33 @@ class Game:
         self.table_cards = []
         self.pot = PotManager()
         self.turn_index = -1
-        self.last_raise = None
+        self.turn_deadline = None
+        self.blind_deadline = None
+        self.last_showdown = None
 
-    def add_player(self, user: discord.User) -> bool:
+    def add_player(self, user: "discord.User") -> bool:
         if self.is_player(user):
             return False
 
+        self.record("join", user.id, user.name)
         self.players.append(Player(user))
 
         return True
 
-    def is_player(self, user: discord.User) -> bool:
+    def is_player(self, user: "discord.User") -> bool:
         for player in self.players:
             if player.user == user:
                 return True
 
         return False
 
+    def get_player(self, user: "discord.User") -> Player:
+        for player in self.players:
+            if player.user == user:
+                return player
+
+        return None
+
     def leave_hand(self, player_to_remove: Player) -> None:
         for i, player in enumerate(self.players_in_hand):
             if player == player_to_remove:
@@ -97,6 +154,7 @@ class Game:
         return self.players_in_hand[self.turn_index]
 
     def start(self) -> List[str]:
+        self.record("start")
         self.state = GameState.NO_HANDS
         self.dealer_index = 0
 
@@ -104,10 +162,18 @@ class Game:
             player.balance = self.options["Buy-in"]
 
         self.options["Blind"] = self.options["Starting-blind"]
+        self.blind_deadline = self.deadline(self.options["Raise-delay"] * 60)
         return ["The game has begun!"] + self.get_status_between_rounds()
 
-    def deal_hands(self) -> List[str]:
-        self.current_deck = Deck()
+    def deal_hands(self, seed: int = None) -> List[str]:
+        # 128 bits, so the deck can't be found by trying every seed against
+        # the cards a player has seen. The seed is only written to the action
+        # log, which players never read directly.
+        if seed is None:
+            seed = secrets.randbits(128)
+        self.record("deal", seed)
+
+        self.current_deck = Deck(seed)
         self.table_cards = []
         self.players_in_hand = []
 
@@ -129,19 +195,37 @@ class Game:
 
         return messages + self.next_turn()
 
-    def pay_blinds(self) -> List[str]:
-        messages: List[str] = []
+    def deadline(self, seconds: float) -> Optional[float]:
+        # Deadlines are wall-clock timestamps; whoever runs the game decides
+        # when to check them.
+        return self.now() + seconds if seconds > 0 else None
+
+    def raise_blinds(self, now: float = None) -> List[str]:
+        if self.state in (GameState.NO_GAME, GameState.WAITING) or \
+                self.blind_deadline is None or (now or time.time()) < self.blind_deadline:
+            return []
+
+        return self.set_blind(self.options["Blind"] * 2)
+
+    def set_blind(self, blind: int) -> List[str]:
+        self.record("blind", blind)
+        self.options["Blind"] = blind
+        self.blind_deadline = self.deadline(self.options["Raise-delay"] * 60)
+        return [f"**Blinds have doubled! From the next hand, the small blind "
+                f"is ${blind}.**"]
 
-        raise_delay = self.options["Raise-delay"]
-        if raise_delay == 0:
-            self.last_raise = None
-        elif self.last_raise is None:
-            self.last_raise = datetime.now()
-        elif datetime.now() - self.last_raise > timedelta(minutes=raise_delay):
-            messages.append("**Blinds are being doubled this round!**")
-            self.options["Blind"] *= 2
-            self.last_raise = datetime.now()
+    def time_out(self, now: float = None) -> List[str]:
+        if self.state not in HAND_STATES or \
+                self.turn_deadline is None or (now or time.time()) < self.turn_deadline:
+            return []
 
+        messages = [f"{self.current_player.name} ran out of time."]
+        if self.current_player.current_bet == self.current_bet:
+            return messages + self.check()
+        return messages + self.fold()
+
+    def pay_blinds(self) -> List[str]:
+        messages: List[str] = []
         blind = self.options["Blind"]
 
         if len(self.players) > 2:
@@ -155,6 +239,7 @@ class Game:
             self.turn_index = self.dealer_index
             self.first_better = self.dealer_index - 1
 
+        self.record("blinds", small_player.user.id, big_player.user.id, blind)
         messages.append(f"{small_player.name} has paid the small blind "
                         f"of ${blind}.")
 
@@ -220,14 +305,20 @@ class Game:
     def next_turn(self) -> List[str]:
         if self.pot.round_over():
             if self.pot.betting_over():
-                return self.showdown()
+                messages = self.showdown()
             else:
-                return self.next_round()
+                messages = self.next_round()
         else:
             self.turn_index = (self.turn_index + 1) % len(self.players_in_hand)
-            return self.get_current_options()
+            messages = self.get_current_options()
+
+        # Every turn gets the full Turn-time.
+        if self.state in HAND_STATES:
+            self.turn_deadline = self.deadline(self.options["Turn-time"])
+        return messages
 
     def showdown(self) -> List[str]:
+        self.turn_deadline = None
         while len(self.table_cards) < 5:
             self.table_cards.append(self.current_deck.draw())
 
@@ -240,10 +331,12 @@ class Game:
             messages.append(f"{player.name}'s hand: "
                             f"{player.cards[0]}  {player.cards[1]}")
 
-        winners = self.pot.get_winners(self.table_cards)
-        
+        evaluator = ShowdownEvaluator(self.table_cards)
+        winners = self.pot.get_winners(evaluator)
+        self.last_showdown = evaluator
+
         for winner, winnings in sorted(winners.items(), key=lambda item: item[1]):
-            hand_name = str(get_best_possible_hand(self.table_cards, winner.cards))
+            hand_name = evaluator.hand_name(winner)
             messages.append(f"{winner.name} wins ${winnings} with a {hand_name}.")
             winner.balance += winnings
 
@@ -271,10 +364,12 @@ class Game:
         return messages
 
     def check(self) -> List[str]:
+        self.record("check", self.current_player.user.id)
         self.current_player.placed_bet = True
         return [f"{self.current_player.name} checks."] + self.next_turn()
 
     def raise_bet(self, amount: int) -> List[str]:
+        self.record("raise", self.current_player.user.id, amount)
         self.pot.handle_raise(self.current_player, amount)
         messages = [f"{self.current_player.name} raises by ${amount}."]
 
@@ -286,6 +381,7 @@ class Game:
         return messages + self.next_turn()
 
     def call(self) -> List[str]:
+        self.record("call", self.current_player.user.id)
         self.pot.handle_call(self.current_player)
         messages = [f"{self.current_player.name} calls."]
 
@@ -297,21 +393,24 @@ class Game:
         return messages + self.next_turn()
 
     def all_in(self) -> List[str]:
+        # Recorded as the call or raise it turns into.
         if self.pot.current_bet > self.current_player.max_bet:
             return self.call()
         else:
             return self.raise_bet(self.current_player.max_bet - self.current_bet)
 
     def fold(self) -> List[str]:
+        self.record("fold", self.current_player.user.id)
         messages = [f"{self.current_player.name} has folded."]
         self.pot.handle_fold(self.current_player)
         self.leave_hand(self.current_player)
 
-        if len(self.pot.players()) == 1:
-            winner = list(self.pot.players())[0]
+        if len(self.pot.players_in_pot()) == 1:
+            winner = list(self.pot.players_in_pot())[0]
             messages += [f"{winner.name} wins ${self.pot.value}!"]
             winner.balance += self.pot.value
             self.state = GameState.NO_HANDS
+            self.turn_deadline = None
             self.next_dealer()
             return messages + self.get_status_between_rounds()
 
@@ -321,12 +420,23 @@ class Game:
 
         return self.showdown()
 
-    async def tell_hands(self, client: discord.Client) -> None:
-        for player in self.players:
-            embed = discord.Embed(
-                description=str(player.cards[0]) + " " + str(player.cards[1]),
-                color=0x00ff00
-            )
-
-            await player.user.send(embed=embed)
+    async def tell_hands(self, channel: "discord.abc.Messageable",
+                         players: List[Player] = None) -> None:
+        # Imported here so the engine can run headless without discord.py.
+        import discord
+        from utils.direct_messages import send_all
+
+        # Players all in on their blind have already left players_in_hand.
+        errors = await send_all(
+            (player.user, discord.Embed(description=str(player.cards[0]) + " " +
+                                        str(player.cards[1]), color=0x00ff00))
+            for player in (list(self.pot.players_in_pot()) if players is None else players)
+        )
+
+        if errors:
+            errors.append("Message !pkr-cards once direct messages are open "
+                          "to get your cards.")
+            await channel.send(embed=discord.Embed(description="\n".join(errors),
+                                                   color=0x00ff00),
+                               delete_after=60)
 
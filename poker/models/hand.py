@@ -2,7 +2,6 @@ from functools import total_ordering
 from typing import List
 
 from .card import Card
-from utils.poker_constants import RANKS, Rank
 from utils.ranking_constants import Ranking
 
 
@@ -56,7 +55,7 @@ class Hand:
         if self.rank != other.rank:
             return False
         for self_card, other_card in zip(self.cards, other.cards):
-            if self_card != other_card:
+            if not self_card.same_rank(other_card):
                 return False
         return True
 
@@ -90,7 +89,7 @@ class Hand:
         self.cards += flat_duplicates
 
     def is_straight(self) -> bool:
-        ranks = [RANKS[card.rank].Value for card in self.cards]
+        ranks = [card.value for card in self.cards]
         
         for i in range(1, 5):
             if ranks[i - 1] != ranks[i] - 1:
@@ -117,7 +116,7 @@ class Hand:
         current_duplicates: List[Card] = [self.cards[0]]
 
         for card in self.cards[1:]:
-            if current_duplicates[0] != card:
+            if not current_duplicates[0].same_rank(card):
                 if len(current_duplicates) > 1:
                     duplicates.append(current_duplicates)
                 current_duplicates = [card]
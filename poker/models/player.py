@@ -1,15 +1,17 @@
-from typing import Tuple
-import discord
+from typing import TYPE_CHECKING, Tuple
 from .card import Card
 
+if TYPE_CHECKING:
+    import discord
+
 class Player:
     balance: int
-    user: discord.User
+    user: "discord.User"
     cards: Tuple[Card, Card]
     current_bet: int
     placed_bet: bool
 
-    def __init__(self, user: discord.User) -> None:
+    def __init__(self, user: "discord.User") -> None:
         self.balance = 0
         self.user = user
         self.cards = None
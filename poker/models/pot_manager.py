@@ -1,69 +1,82 @@
-from typing import Dict, List, Set
-from .card import Card
+from typing import Dict, KeysView, List
 from .player import Player
 from .pot import Pot
+from .showdown import ShowdownEvaluator
 
 
 class PotManager:
-    pots: List[Pot]
+    # Betting only records how much each player has put in this hand. The
+    # main pot and side pots are built from those totals when they are
+    # needed, by sweeping the distinct contribution levels in sorted order.
+    contributions: Dict[Player, int]
+    live: Dict[Player, None]
+    current_bet: int
+    value: int
 
     def __init__(self) -> None:
-        self.pots = []
+        self.contributions = {}
+        self.live = {}
+        self.current_bet = 0
+        self.value = 0
 
     def new_hand(self, players: List[Player]) -> None:
-        self.pots = [Pot(set(players))]
+        self.contributions = {player: 0 for player in players}
+        self.live = dict.fromkeys(players)
+        self.current_bet = 0
+        self.value = 0
 
-    @property
-    def current_bet(self) -> int:
-        return sum(pot.current_bet for pot in self.pots)
+    def increase_bet(self, new_amount: int) -> None:
+        self.current_bet = new_amount
+
+    def players_in_pot(self) -> KeysView[Player]:
+        return self.live.keys()
 
     @property
-    def value(self) -> int:
-        return sum(pot.total for pot in self.pots)
+    def pots(self) -> List[Pot]:
+        ordered = sorted(self.contributions.items(), key=lambda item: item[1])
+        live = [(player, amount) for player, amount in ordered if player in self.live]
+        pots: List[Pot] = []
+        previous = 0
+        index = 0
+
+        for position, (_, level) in enumerate(live):
+            if level == previous:
+                continue
 
-    def increase_bet(self, new_amount: int) -> None:
-        accumulated_bet = 0
+            total = 0
+            while index < len(ordered) and ordered[index][1] <= level:
+                total += ordered[index][1] - previous
+                index += 1
+            total += (len(ordered) - index) * (level - previous)
 
-        while self.pots[-1].max_bet < new_amount:
-            self.pots[-1].current_bet = self.pots[-1].max_bet - accumulated_bet
-            accumulated_bet += self.pots[-1].current_bet
-            self.pots.append(self.pots[-1].create_side_pot())
+            pots.append(Pot({player for player, _ in live[position:]}, total))
+            previous = level
 
-        new_bet = min(self.pots[-1].max_bet, new_amount)
-        self.pots[-1].current_bet = new_bet - accumulated_bet
+        # Chips folded players put in above the highest live contribution.
+        leftover = self.value - sum(pot.total for pot in pots)
+        if leftover:
+            if pots:
+                pots[-1].total += leftover
+            else:
+                pots.append(Pot(set(self.live), leftover))
 
-    def players_in_pot(self) -> Set[Player]:
-        return self.pots[0].players
+        return pots
 
     def debug_print(self):
         for i, pot in enumerate(self.pots):
-            print(f"Pot #{i}. Bet: ${pot.current_bet} (Max: {pot.max_bet}). "
-                  f"Amount: ${pot.total}.")
+            print(f"Pot #{i}. Amount: ${pot.total}.")
             for player in pot.players:
-                print(f"{player.name}: {player.balance}")
+                print(f"{player.name}: {player.balance} "
+                      f"(put in ${self.contributions[player]})")
             print("-----")
 
     def handle_fold(self, player: Player) -> None:
-        for pot in self.pots:
-            if player in pot.players:
-                pot.players.remove(player)
+        self.live.pop(player, None)
 
     def handle_call(self, player: Player) -> None:
-        new_amount = player.bet(min(player.max_bet, self.current_bet))
-        old_bet = player.current_bet - new_amount
-        pot_index = 0
-
-        while new_amount > 0:
-            current_pot = self.pots[pot_index]
-            old_bet -= current_pot.current_bet
-
-            if old_bet < 0:
-                current_pot.total -= old_bet
-                new_amount += old_bet
-                old_bet = 0
-
-            pot_index += 1
-
+        paid = player.bet(min(player.max_bet, self.current_bet))
+        self.contributions[player] += paid
+        self.value += paid
         player.placed_bet = True
 
     def handle_raise(self, player: Player, new_amount: int) -> None:
@@ -80,7 +93,7 @@ class PotManager:
         if self.betting_over():
             return True
 
-        for player in self.pots[0].players:
+        for player in self.live:
             if player.balance == 0:
                 continue
             elif not player.placed_bet or player.current_bet < self.current_bet:
@@ -91,7 +104,7 @@ class PotManager:
     def betting_over(self) -> bool:
         players_left_betting = False
 
-        for player in self.pots[0].players:
+        for player in self.live:
             if player.balance > 0:
                 if players_left_betting or not player.placed_bet:
                     return False
@@ -101,32 +114,30 @@ class PotManager:
 
         return True
 
-    def get_winners(self, table_cards: List[Card]) -> Dict[Player, int]:
+    def get_winners(self, evaluator: ShowdownEvaluator) -> Dict[Player, int]:
         winners: Dict[Player, int] = {}
+        seats = {player: seat for seat, player in enumerate(self.contributions)}
 
         for pot in self.pots:
-            pot_winners = pot.get_winners(table_cards)
+            pot_winners = sorted(pot.get_winners(evaluator), key=seats.get)
 
             if len(pot_winners) == 0:
                 continue
 
-            pot_won = pot.total // len(pot_winners)
+            # Chips that don't split evenly go to the first winners by seat.
+            pot_won, odd_chips = divmod(pot.total, len(pot_winners))
 
-            if pot_won > 0:
-                for winner in pot_winners:
+            for i, winner in enumerate(pot_winners):
+                winnings = pot_won + (1 if i < odd_chips else 0)
+                if winnings > 0:
                     winners.setdefault(winner, 0)
-                    winners[winner] += pot_won
+                    winners[winner] += winnings
 
         return winners
 
     def next_round(self) -> None:
-        for pot in self.pots:
-            pot.current_bet = 0
-            pot.max_bet = 0
+        self.current_bet = 0
 
-        for player in self.pots[-1].players:
+        for player in self.live:
             player.placed_bet = False
             player.current_bet = 0
-
-        self.pots[-1].max_bet = min(player.max_bet for player in self.pots[-1].players)
-
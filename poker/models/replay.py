@@ -0,0 +1,94 @@
+import base64
+import time
+from collections import deque
+from typing import Iterable, List
+
+from .game import Game
+from utils.game_constants import HAND_STATES
+from .snapshot import StoredUser, UserResolver, dump_game, load_game
+
+
+# Applies events recorded by Game.record back onto a Game. Replaying the
+# events of a table in order reproduces its state and its messages exactly.
+
+def snapshot_event(game: Game) -> List:
+    return [game.log_seq, "snapshot", round(time.time(), 3),
+            base64.b64encode(dump_game(game)).decode()]
+
+
+def apply_event(game: Game, event: List, resolve_user: UserResolver = StoredUser) -> List[str]:
+    seq, kind, game.clock, *args = event
+    recorder, game.recorder = game.recorder, None
+
+    try:
+        if kind == "snapshot":
+            restored = load_game(base64.b64decode(args[0]), resolve_user)
+            game.__dict__.update(restored.__dict__)
+            messages = []
+        elif kind == "new":
+            game.new_game(resolve_user(*args))
+            messages = []
+        elif kind == "join":
+            game.add_player(resolve_user(*args))
+            messages = []
+        elif kind == "set":
+            game.set_option(*args)
+            messages = []
+        elif kind == "start":
+            messages = game.start()
+        elif kind == "blind":
+            messages = game.set_blind(args[0])
+        elif kind == "deal":
+            messages = game.deal_hands(args[0])
+        elif kind == "check":
+            messages = game.check()
+        elif kind == "call":
+            messages = game.call()
+        elif kind == "raise":
+            messages = game.raise_bet(args[1])
+        elif kind == "fold":
+            messages = game.fold()
+        elif kind == "blinds":
+            # Paid as part of the deal; kept in the log for hand histories.
+            messages = []
+        else:
+            raise ValueError(f"Unknown event {kind!r}")
+    finally:
+        game.recorder = recorder
+        game.clock = None
+
+    game.log_seq = seq
+    return messages
+
+
+def replay(game: Game, events: Iterable[List], resolve_user: UserResolver = StoredUser) -> Game:
+    for event in events:
+        apply_event(game, event, resolve_user)
+    return game
+
+
+def hand_histories(events: Iterable[List], limit: int) -> List[List[str]]:
+    # Replays the log from the start, keeping only the messages of the last
+    # few hands, so memory stays flat however long the log is.
+    game = Game()
+    hands: deque = deque(maxlen=limit)
+    current: List[str] = None
+    dealt = 0
+
+    for event in events:
+        kind = event[1]
+        if kind in ("new", "snapshot"):
+            current = None
+        elif kind == "deal":
+            dealt += 1
+            current = [f"**Hand {dealt}**"]
+            hands.append(current)
+
+        messages = apply_event(game, event)
+        if current is not None:
+            current += messages
+
+    # A hand still being played stays hidden until it is over.
+    if current is not None and game.state in HAND_STATES:
+        hands.pop()
+    return list(hands)
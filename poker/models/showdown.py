@@ -0,0 +1,59 @@
+import time
+from typing import Dict, List, Iterable
+
+from .card import Card
+from .hand import Hand
+from .player import Player
+from utils.evaluator import best_cards, seven_card_strength
+
+
+class ShowdownEvaluator:
+    table_cards: List[Card]
+    strengths: Dict[Player, int]
+    evaluations: int
+    lookups: int
+    seconds: float
+
+    def __init__(self, table_cards: List[Card]) -> None:
+        self.table_cards = table_cards
+        self.strengths = {}
+        self.evaluations = 0
+        self.lookups = 0
+        self.seconds = 0.0
+
+    @property
+    def saved(self) -> int:
+        return self.lookups - self.evaluations
+
+    def strength(self, player: Player) -> int:
+        self.lookups += 1
+
+        if player not in self.strengths:
+            started = time.perf_counter()
+            self.strengths[player] = seven_card_strength(self.encoded_cards(player))
+            self.seconds += time.perf_counter() - started
+            self.evaluations += 1
+
+        return self.strengths[player]
+
+    def encoded_cards(self, player: Player) -> List[int]:
+        return [card.encoded for card in tuple(self.table_cards) + player.cards]
+
+    def best_players(self, players: Iterable[Player]) -> List[Player]:
+        winners: List[Player] = []
+        best_strength = 0
+
+        for player in players:
+            strength = self.strength(player)
+            if strength > best_strength:
+                winners = [player]
+                best_strength = strength
+            elif strength == best_strength:
+                winners.append(player)
+
+        return winners
+
+    def hand_name(self, player: Player) -> str:
+        cards = {card.encoded: card for card in tuple(self.table_cards) + player.cards}
+        best = best_cards(list(cards), self.strength(player))
+        return str(Hand([cards[encoded] for encoded in best]))
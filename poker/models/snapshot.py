@@ -0,0 +1,114 @@
+import json
+import zlib
+from typing import Callable, Dict, List
+
+from .card import CARDS
+from .deck import Deck
+from .game import Game
+from .player import Player
+from .pot_manager import PotManager
+from utils.game_constants import HAND_STATES, GameState
+
+
+# Snapshots are compact JSON (card ids, seat indexes, no names beyond the
+# players') compressed with zlib. Users are stored by id and resolved again
+# when the snapshot is loaded.
+SNAPSHOT_VERSION = 1
+
+
+class StoredUser:
+    # Stands in for a discord.User that hasn't been seen since the restart.
+    id: int
+    name: str
+
+    def __init__(self, user_id: int, name: str) -> None:
+        self.id = user_id
+        self.name = name
+
+    def __eq__(self, other) -> bool:
+        return getattr(other, "id", None) == self.id
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+
+UserResolver = Callable[[int, str], object]
+
+
+def dump_game(game: Game) -> bytes:
+    seats = {player: seat for seat, player in enumerate(game.players)}
+    snapshot = {
+        "v": SNAPSHOT_VERSION,
+        "state": game.state.value,
+        "options": game.options,
+        "players": [[player.user.id, player.user.name, player.balance,
+                     [card.id for card in player.cards] if player.cards else None,
+                     player.current_bet, player.placed_bet]
+                    for player in game.players],
+        "in_hand": [seats[player] for player in game.players_in_hand if player in seats],
+        "dealer": game.dealer_index,
+        "first": game.first_better,
+        "turn": game.turn_index,
+        "deck": [card.id for card in game.current_deck.cards] if game.current_deck else None,
+        "table": [card.id for card in game.table_cards],
+        "deadlines": [game.turn_deadline, game.blind_deadline],
+        "log": [game.log_seq, game.log_offset, game.log_segment],
+    }
+
+    # The pot only means something while a hand is being played; between
+    # hands it can still refer to players who have been knocked out.
+    if game.state in HAND_STATES:
+        snapshot["pot"] = {
+            "contributions": [[seats[player], amount]
+                              for player, amount in game.pot.contributions.items()],
+            "live": [seats[player] for player in game.pot.live],
+            "bet": game.pot.current_bet,
+            "value": game.pot.value,
+        }
+
+    return zlib.compress(json.dumps(snapshot, separators=(",", ":")).encode())
+
+
+def load_game(data: bytes, resolve_user: UserResolver = StoredUser) -> Game:
+    snapshot = json.loads(zlib.decompress(data))
+    if snapshot["v"] != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {snapshot['v']}")
+
+    game = Game()
+    game.state = GameState(snapshot["state"])
+    game.options.update(snapshot["options"])
+
+    players: List[Player] = []
+    for user_id, name, balance, cards, current_bet, placed_bet in snapshot["players"]:
+        player = Player(resolve_user(user_id, name))
+        player.balance = balance
+        player.cards = tuple(CARDS[card_id] for card_id in cards) if cards else None
+        player.current_bet = current_bet
+        player.placed_bet = placed_bet
+        players.append(player)
+
+    game.players = players
+    game.players_in_hand = [players[seat] for seat in snapshot["in_hand"]]
+    game.dealer_index = snapshot["dealer"]
+    game.first_better = snapshot["first"]
+    game.turn_index = snapshot["turn"]
+    game.table_cards = [CARDS[card_id] for card_id in snapshot["table"]]
+
+    if snapshot["deck"] is not None:
+        game.current_deck = Deck.__new__(Deck)
+        game.current_deck.cards = [CARDS[card_id] for card_id in snapshot["deck"]]
+    game.turn_deadline, game.blind_deadline = snapshot.get("deadlines", (None, None))
+    log = snapshot.get("log", (0, 0))
+    game.log_seq, game.log_offset = log[:2]
+    game.log_segment = log[2] if len(log) > 2 else 0
+
+    if "pot" in snapshot:
+        pot: Dict = snapshot["pot"]
+        game.pot = PotManager()
+        game.pot.contributions = {players[seat]: amount
+                                  for seat, amount in pot["contributions"]}
+        game.pot.live = dict.fromkeys(players[seat] for seat in pot["live"])
+        game.pot.current_bet = pot["bet"]
+        game.pot.value = pot["value"]
+
+    return game
@@ -1,23 +1,115 @@
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
 import os
+import time
 import discord
-from typing import Dict, List
+from typing import Awaitable, Dict, List, Optional, Set, Tuple
 from dotenv import load_dotenv
 
 from models.game import Game
-from utils.game_constants import GAME_OPTIONS, GameState
+from models.player import Player
+from models.replay import hand_histories
+from models.snapshot import StoredUser
+from utils.action_log import ActionLog
+from utils.equity import estimate_equity
+from utils.game_constants import GAME_OPTIONS, HAND_STATES, GameState
+from utils.game_store import GameStore, SnapshotWriter
+from utils.metrics import (COMMAND_SECONDS, EVENT_SECONDS, REGISTRY, start as start_metrics,
+                           timed)
+from utils.preflop import preflop_equity
+from utils.scheduler import Scheduler
+from utils.table_lock import TableLocks
+from utils.table_manager import TableManager
+from utils.table_view import TableViews
 
 load_dotenv()
 DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
-
-client = discord.Client()
-games: Dict[discord.TextChannel, Game] = {}
-
-def new_game(game: Game, message: discord.Message) -> List[str]:
+ODDS_WORKERS = int(os.getenv('ODDS_WORKERS', os.cpu_count() or 1))
+ODDS_MARGIN = float(os.getenv('ODDS_MARGIN', 0.01))
+POKER_DB = os.getenv('POKER_DB', 'poker.db')
+SNAPSHOT_INTERVAL = float(os.getenv('SNAPSHOT_INTERVAL', 2))
+SLOW_TABLE_WAIT = float(os.getenv('SLOW_TABLE_WAIT', 1))
+MAX_TABLES = int(os.getenv('MAX_TABLES', 1000))
+TABLE_TTL = float(os.getenv('TABLE_TTL', 1800))
+FINISHED_TABLE_TTL = float(os.getenv('FINISHED_TABLE_TTL', 300))
+TABLE_VIEW_INTERVAL = float(os.getenv('TABLE_VIEW_INTERVAL', 1.5))
+POKER_LOG_DIR = os.getenv('POKER_LOG_DIR', 'hand_logs')
+# Set by supervisor.py for each worker process.
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', 0))
+SHARD_IDS = [int(shard) for shard in os.getenv('SHARD_IDS', '').split(',') if shard]
+# Points the bot at a stand-in gateway for local testing.
+DISCORD_API = os.getenv('DISCORD_API')
+# Workers of a sharded deployment serve metrics on consecutive ports.
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+if METRICS_PORT:
+    METRICS_PORT += int(os.getenv('WORKER_INDEX', 0))
+MAX_HISTORY = 10
+
+if DISCORD_API:
+    discord.http.Route.BASE = DISCORD_API
+
+if SHARD_COUNT:
+    client = discord.AutoShardedClient(shard_count=SHARD_COUNT, shard_ids=SHARD_IDS or None)
+else:
+    client = discord.Client()
+# Started by the first !pkr-odds, so a bot that is never asked for odds
+# never starts the workers.
+odds_executor: ProcessPoolExecutor = None
+game_store = GameStore(POKER_DB)
+action_log = ActionLog(POKER_LOG_DIR)
+snapshot_writer = SnapshotWriter(game_store, SNAPSHOT_INTERVAL, action_log)
+table_locks = TableLocks()
+table_views = TableViews(TABLE_VIEW_INTERVAL)
+background_tasks: Set[asyncio.Future] = set()
+
+def run_in_background(coroutine: Awaitable) -> None:
+    # The task is held until it is done, so it is never garbage collected
+    # half way, and its error is printed instead of lost.
+    task = asyncio.ensure_future(coroutine)
+    background_tasks.add(task)
+    task.add_done_callback(background_done)
+
+def background_done(task: asyncio.Future) -> None:
+    background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Background task {task.get_coro().__qualname__} failed: {task.exception()!r}")
+
+def restore_user(user_id: int, name: str):
+    return client.get_user(user_id) or StoredUser(user_id, name)
+
+# Tables are loaded when they are next used, and catch up on the events
+# logged after their last snapshot.
+tables = TableManager(game_store, snapshot_writer, action_log, table_locks, restore_user,
+                      MAX_TABLES, TABLE_TTL, FINISHED_TABLE_TTL, table_views.discard)
+
+async def resolve_users(game: Game, author: discord.User) -> None:
+    # Players restored from a snapshot get their Discord user back, from the
+    # client's cache if it is there. The rest are fetched together, and a
+    # player whose fetch fails stays stored until the next command.
+    missing = []
+    for player in game.players:
+        if isinstance(player.user, StoredUser):
+            if player.user == author:
+                player.user = author
+            elif game.state != GameState.NO_GAME:
+                player.user = client.get_user(player.user.id) or player.user
+                if isinstance(player.user, StoredUser):
+                    missing.append(player)
+
+    if not missing:
+        return
+    users = await asyncio.gather(*[client.fetch_user(player.user.id) for player in missing],
+                                 return_exceptions=True)
+    for player, user in zip(missing, users):
+        if isinstance(user, Exception):
+            print(f"Failed to fetch user {player.user.id}: {user!r}")
+        else:
+            player.user = user
+
+def new_game(game: Game, message: discord.Message, args: List[str]) -> List[str]:
     if game.state == GameState.NO_GAME:
-        game.init_game()
-        game.add_player(message.author)
-        game.state = GameState.WAITING
+        game.new_game(message.author)
         return [f"A new game has been started by {message.author.name}!",
                 "Message !pkr-join to join the game."]
     else:
@@ -28,7 +120,7 @@ def new_game(game: Game, message: discord.Message) -> List[str]:
                             "message !pkr-join to join that game.")
         return messages
 
-def join_game(game: Game, message: discord.Message) -> List[str]:
+def join_game(game: Game, message: discord.Message, args: List[str]) -> List[str]:
     if game.state == GameState.NO_GAME:
         return ["No game has been started yet for you to join.",
                 "Message !pkr-newgame to start a new game."]
@@ -42,7 +134,7 @@ def join_game(game: Game, message: discord.Message) -> List[str]:
     else:
         return [f"You've already joined the game {message.author.name}!"]
 
-def start_game(game: Game, message: discord.Message) -> List[str]:
+def start_game(game: Game, message: discord.Message, args: List[str]) -> List[str]:
     if game.state == GameState.NO_GAME:
         return ["Message !pkr-newgame if you would like to start a new game."]
     elif game.state != GameState.WAITING:
@@ -57,7 +149,7 @@ def start_game(game: Game, message: discord.Message) -> List[str]:
     else:
         return game.start()
 
-def deal_hand(game: Game, message: discord.Message) -> List[str]:
+def deal_hand(game: Game, message: discord.Message, args: List[str]) -> List[str]:
     if game.state == GameState.NO_GAME:
         return ["No game has been started for you to deal. "
                 "Message !pkr-newgame to start one."]
@@ -71,7 +163,7 @@ def deal_hand(game: Game, message: discord.Message) -> List[str]:
     else:
         return game.deal_hands()
 
-def call_bet(game: Game, message: discord.Message) -> List[str]:
+def call_bet(game: Game, message: discord.Message, args: List[str]) -> List[str]:
     if game.state == GameState.NO_GAME:
         return ["No game has been started yet. Message !pkr-newgame to start one."]
     elif game.state == GameState.WAITING:
@@ -88,7 +180,7 @@ def call_bet(game: Game, message: discord.Message) -> List[str]:
     else:
         return game.call()
 
-def check(game: Game, message: discord.Message) -> List[str]:
+def check(game: Game, message: discord.Message, args: List[str]) -> List[str]:
     if game.state == GameState.NO_GAME:
         return ["No game has been started yet. Message !pkr-newgame to start one."]
     elif game.state == GameState.WAITING:
@@ -108,7 +200,7 @@ def check(game: Game, message: discord.Message) -> List[str]:
     else:
         return game.check()
 
-def raise_bet(game: Game, message: discord.Message) -> List[str]:
+def raise_bet(game: Game, message: discord.Message, args: List[str]) -> List[str]:
     if game.state == GameState.NO_GAME:
         return ["No game has been started yet. Message !pkr-newgame to start one."]
     elif game.state == GameState.WAITING:
@@ -122,14 +214,12 @@ def raise_bet(game: Game, message: discord.Message) -> List[str]:
         return [f"You can't raise, {message.author.name}, because it's "
                 f"{game.current_player.name}'s turn."]
 
-    tokens = message.content.split()
-
-    if len(tokens) < 2:
+    if not args:
         return [f"Please follow !pkr-raise with the amount that you would "
                 "like to raise it by."]
 
     try:
-        amount = int(tokens[1])
+        amount = int(args[0])
 
         if game.current_bet >= game.current_player.max_bet:
             return ["You don't have enough money to raise the current bet "
@@ -142,9 +232,9 @@ def raise_bet(game: Game, message: discord.Message) -> List[str]:
         return game.raise_bet(amount)
     except ValueError:
         return ["Please follow !pkr-raise with an integer. "
-                f"'{tokens[1]}' is not an integer."]
+                f"'{args[0]}' is not an integer."]
 
-def fold_hand(game: Game, message: discord.Message) -> List[str]:
+def fold_hand(game: Game, message: discord.Message, args: List[str]) -> List[str]:
     if game.state == GameState.NO_GAME:
         return ["No game has been started yet. "
                 "Message !pkr-newgame to start one."]
@@ -161,7 +251,7 @@ def fold_hand(game: Game, message: discord.Message) -> List[str]:
     else:
         return game.fold()
 
-def show_help(game: Game, message: discord.Message) -> List[str]:
+def show_help(game: Game, message: discord.Message, args: List[str]) -> List[str]:
     longest_command = len(max(commands, key=len))
     help_lines = []
 
@@ -171,7 +261,7 @@ def show_help(game: Game, message: discord.Message) -> List[str]:
 
     return ['```' + '\n'.join(help_lines) + '```']
 
-def show_options(game: Game, message: discord.Message) -> List[str]:
+def show_options(game: Game, message: discord.Message, args: List[str]) -> List[str]:
     longest_option = len(max(game.options, key=len))
     longest_value = max([len(str(val)) for key, val in game.options.items()])
     option_lines = []
@@ -184,39 +274,37 @@ def show_options(game: Game, message: discord.Message) -> List[str]:
 
     return ['```' + '\n'.join(option_lines) + '```']
 
-def set_option(game: Game, message: discord.Message) -> List[str]:
-    tokens = message.content.split()
-
-    if len(tokens) == 2:
+def set_option(game: Game, message: discord.Message, args: List[str]) -> List[str]:
+    if len(args) == 1:
         return ["You must specify a new value after the name of an option "
                 "when using the !set command."]
-    elif len(tokens) == 1:
+    elif not args:
         return ["You must specify an option and value to set when using "
                 "the !set command."]
-    elif tokens[1] not in GAME_OPTIONS:
-        return [f"'{tokens[1]}' is not an option. Message !options to see "
+    elif args[0] not in GAME_OPTIONS:
+        return [f"'{args[0]}' is not an option. Message !options to see "
                 "the list of options."]
 
     try:
-        val = int(tokens[2])
+        val = int(args[1])
 
         if val < 0:
-            return [f"Cannot set {tokens[1]} to a negative value!"]
-        game.options[tokens[1]] = val
+            return [f"Cannot set {args[0]} to a negative value!"]
+        game.set_option(args[0], val)
 
-        return [f"The {tokens[1]} is now set to {tokens[2]}."]
+        return [f"The {args[0]} is now set to {args[1]}."]
     except ValueError:
-        return [f"{tokens[1]} must be set to an integer, and '{tokens[2]}'"
+        return [f"{args[0]} must be set to an integer, and '{args[1]}'"
                 " is not a valid integer."]
 
-def chip_count(game: Game, message: discord.Message) -> List[str]:
+def chip_count(game: Game, message: discord.Message, args: List[str]) -> List[str]:
     if game.state in (GameState.NO_GAME, GameState.WAITING):
         return ["You can't request a chip count because the game "
                 "hasn't started yet."]
     return [f"{player.user.name} has ${player.balance}."
             for player in game.players]
 
-def all_in(game: Game, message: discord.Message) -> List[str]:
+def all_in(game: Game, message: discord.Message, args: List[str]) -> List[str]:
     if game.state == GameState.NO_GAME:
         return ["No game has been started yet. Message !newgame to start one."]
     elif game.state == GameState.WAITING:
@@ -233,8 +321,119 @@ def all_in(game: Game, message: discord.Message) -> List[str]:
     else:
         return game.all_in()
 
+def show_odds(game: Game, message: discord.Message, args: List[str]) -> List[str]:
+    if game.state == GameState.NO_GAME:
+        return ["No game has been started yet. Message !pkr-newgame to start one."]
+    elif game.state in (GameState.WAITING, GameState.NO_HANDS):
+        return ["There are no odds to calculate until the hands have been dealt."]
+    elif not game.is_player(message.author):
+        return ["You can't check your odds, because you're not playing, "
+                f"{message.author.name}."]
+
+    player = game.get_player(message.author)
+
+    if player not in game.pot.players_in_pot():
+        return [f"You're no longer in this hand, {message.author.name}."]
+
+    # Opponents' hole cards are unknown to the player, so they are sampled
+    # together with the cards left in the deck.
+    opponents = [other for other in game.pot.players_in_pot() if other is not player]
+    unknown = [card.id for card in game.current_deck.cards]
+    unknown += [card.id for other in game.players if other is not player
+                for card in other.cards]
+
+    run_in_background(send_odds(
+        player, [card.id for card in player.cards],
+        [card.id for card in game.table_cards], unknown, len(opponents),
+        game.options["Odds-samples"], game.options["Odds-time"] / 1000
+    ))
+
+    return [f"Calculating your odds, {message.author.name}. "
+            "They will be sent to you in a direct message."]
+
+def get_odds_executor() -> ProcessPoolExecutor:
+    global odds_executor
+    if odds_executor is None:
+        odds_executor = ProcessPoolExecutor(max_workers=ODDS_WORKERS)
+    return odds_executor
+
+async def send_odds(player: Player, hole: List[int], board: List[int],
+                    unknown: List[int], opponents: int, samples: int,
+                    time_budget: float) -> None:
+    description = (f"{player.cards[0]}  {player.cards[1]} against {opponents} "
+                   f"opponent{'s' if opponents != 1 else ''}: ")
+    share = preflop_equity(player.cards, opponents) if not board and opponents else None
+
+    if share is not None:
+        description += f"equity {share:.1%} before the flop."
+    else:
+        equity = await estimate_equity(get_odds_executor(), ODDS_WORKERS, hole, board, unknown,
+                                       opponents, samples, time_budget, ODDS_MARGIN)
+        description += (f"{equity.Win:.1%} to win, {equity.Tie:.1%} to tie "
+                        f"(equity {equity.Share:.1%} ± {equity.Margin:.1%} "
+                        f"over {equity.Samples} runouts).")
+
+    embed = discord.Embed(description=description, color=0x00ff00)
+
+    await player.user.send(embed=embed)
+
+def show_cards(game: Game, message: discord.Message, args: List[str]) -> List[str]:
+    if game.state not in HAND_STATES:
+        return ["There are no cards to send until the hands have been dealt."]
+
+    player = game.get_player(message.author)
+
+    if player not in game.pot.players_in_pot():
+        return [f"You're no longer in this hand, {message.author.name}."]
+
+    run_in_background(game.tell_hands(message.channel, [player]))
+
+    return [f"Your cards will be sent to you in a direct message, {message.author.name}."]
+
+def show_history(game: Game, message: discord.Message, args: List[str]) -> List[str]:
+    try:
+        count = int(args[0]) if args else 1
+    except ValueError:
+        return ["Please follow !pkr-history with the number of hands to see. "
+                f"'{args[0]}' is not an integer."]
+
+    if not 1 <= count <= MAX_HISTORY:
+        return [f"You can see between 1 and {MAX_HISTORY} past hands."]
+
+    run_in_background(send_history(message.author, message.channel.id, count))
+
+    return [f"The last {count} hand{'s' if count != 1 else ''} will be sent to you "
+            f"in a direct message, {message.author.name}."]
+
+async def send_history(user: discord.User, channel_id: int, count: int) -> None:
+    # The log is replayed from disk in a thread, so a long history neither
+    # blocks the event loop nor has to fit in memory.
+    await action_log.flush()
+    loop = asyncio.get_event_loop()
+    hands = await loop.run_in_executor(
+        None, hand_histories, action_log.events(channel_id), count
+    )
+
+    if not hands:
+        await user.send(embed=discord.Embed(description="No hands have been played here yet.",
+                                            color=0x00ff00))
+    for hand in hands:
+        description = '\n'.join(hand)
+        if len(description) > 4096:
+            description = description[:4095] + '…'
+        await user.send(embed=discord.Embed(description=description, color=0x00ff00))
+
 Command = namedtuple("Command", ["Description", "Action"])
 
+COMMAND_PREFIX = '!p'
+
+def parse_command(content: str) -> Tuple[Optional[str], List[str]]:
+    # Tokenized once; the handlers get the words after the command.
+    tokens = content.split()
+    if not tokens or not tokens[0].startswith(COMMAND_PREFIX):
+        return None, []
+    return tokens[0], tokens[1:]
+
 commands: Dict[str, Command] = {
     '!pkr-newgame': Command('Starts a new game, allowing players to join.', new_game),
     '!pkr-join':    Command('Lets you join a game that is about to begin', join_game),
@@ -248,51 +447,178 @@ commands: Dict[str, Command] = {
     '!pkr-options': Command('Show the list of options and their current values', show_options),
     '!pkr-set':     Command('Set the value of an option', set_option),
     '!pkr-count':   Command('Shows how many chips each player has left', chip_count),
-    '!pkr-all-in':  Command('Bets the entirety of your remaining chips', all_in)
+    '!pkr-all-in':  Command('Bets the entirety of your remaining chips', all_in),
+    '!pkr-odds':    Command('Sends you your chances of winning the hand', show_odds),
+    '!pkr-cards':   Command('Sends you your hole cards again', show_cards),
+    '!pkr-history': Command('Sends you the log of the last hands played', show_history)
 }
 
+HANDS = REGISTRY.counter("poker_hands_total", "Hands played to the end").labels()
+HANDS_PER_MINUTE = REGISTRY.meter("poker_hands_per_minute",
+                                  "Hands played to the end in the last minute").labels()
+EVALUATIONS = REGISTRY.counter("poker_hand_evaluations_total",
+                               "Seven card hands evaluated at showdowns").labels()
+EVALUATION_SECONDS = REGISTRY.histogram("poker_showdown_evaluation_seconds",
+                                        "Time spent evaluating the hands of one showdown",
+                                        buckets=(0.00001, 0.00002, 0.00005, 0.0001, 0.0002,
+                                                 0.0005, 0.001, 0.005)).labels()
+LOCK_WAIT_SECONDS = REGISTRY.histogram("poker_table_lock_wait_seconds",
+                                       "Time a command waited for its table").labels()
+LOCK_DEPTH = REGISTRY.histogram("poker_table_queue_depth",
+                                "Commands at a table, this one included, when a command arrived",
+                                buckets=(1, 2, 3, 5, 10, 20, 50)).labels()
+REGISTRY.gauge_function("poker_table_commands_waiting",
+                        "Commands queued behind another command for their table",
+                        table_locks.waiting)
+REGISTRY.gauge_function("poker_table_queue_depth_max",
+                        "Commands at the busiest table, the one running included",
+                        table_locks.deepest)
+REGISTRY.gauge_function("poker_tables_active", "Tables loaded in memory", lambda: len(tables))
+REGISTRY.gauge_function("poker_tables_evicted", "Tables dropped from memory since the start",
+                        lambda: tables.evictions)
+REGISTRY.gauge_function("poker_table_view_updates", "Changes made to table views since the start",
+                        table_views.updates)
+REGISTRY.gauge_function("poker_table_view_edits",
+                        "Messages sent or edited for table views since the start",
+                        table_views.edits)
+REGISTRY.gauge_function("poker_timers_pending", "Turn and blind deadlines waiting to fire",
+                        lambda: len(timers))
+command_seconds = {command: COMMAND_SECONDS.labels(command) for command in commands}
+message_seconds = EVENT_SECONDS.labels("message")
+timer_seconds = EVENT_SECONDS.labels("timer")
+
+def record_hand(game: Game, in_hand: bool, showdown) -> None:
+    # Called after a game has changed, with what it was before.
+    if in_hand and game.state not in HAND_STATES:
+        HANDS.inc()
+        HANDS_PER_MINUTE.mark()
+    # A new game clears the last showdown.
+    if game.last_showdown is not None and game.last_showdown is not showdown:
+        EVALUATIONS.inc(game.last_showdown.evaluations)
+        EVALUATION_SECONDS.observe(game.last_showdown.seconds)
+
+# Replies to these are always sent as their own message.
+INFO_COMMANDS = {'!pkr-help', '!pkr-options'}
+
+async def send_messages(channel: discord.TextChannel, game: Game, messages: List[str],
+                        replies: List = (), info: bool = False) -> None:
+    # With the table view on, game messages only update the view, which is
+    # edited at most once per TABLE_VIEW_INTERVAL.
+    if not game.options["Table-view"]:
+        table_views.discard(channel.id)
+    elif not info:
+        table_views.update(channel, game, messages)
+        await asyncio.gather(*replies)
+        return
+
+    embed = discord.Embed(
+        description='\n'.join(messages),
+        color=0x00ff00
+    )
+
+    await asyncio.gather(*replies, channel.send(embed=embed, delete_after=60))
+
+def watch_timers(channel_id: int, game: Game) -> None:
+    for kind, deadline in (("turn", game.turn_deadline), ("blind", game.blind_deadline)):
+        if deadline is None:
+            timers.cancel((channel_id, kind))
+        else:
+            timers.schedule((channel_id, kind), deadline)
+
+@timed(timer_seconds)
+async def run_timer(channel_id: int, kind: str) -> None:
+    channel = client.get_channel(channel_id)
+    # Blinds of an evicted table catch up when it is next loaded.
+    if channel is None or kind == "blind" and channel_id not in tables:
+        return
+
+    async with table_locks[channel_id]:
+        game = await tables.get(channel_id)
+        in_hand, showdown = game.state in HAND_STATES, game.last_showdown
+        messages = game.time_out() if kind == "turn" else game.raise_blinds()
+        record_hand(game, in_hand, showdown)
+        watch_timers(channel_id, game)
+
+        if messages:
+            snapshot_writer.mark_dirty(channel_id, game)
+            await action_log.flush()
+            await send_messages(channel, game, messages)
+
+# Turn and blind deadlines of every table share this one scheduler.
+timers = Scheduler(lambda key: run_in_background(run_timer(*key)))
+
 @client.event
 async def on_ready():
-    print("Poker bot ready!")
+    await start_metrics(client, METRICS_PORT)
+    action_log.start()
+    snapshot_writer.start()
+    tables.start()
+
+    # Turns that were running when the bot stopped time out as planned.
+    for channel_id, deadline in await game_store.deadlines_async():
+        if (channel_id, "turn") not in timers.deadlines:
+            timers.schedule((channel_id, "turn"), deadline)
+    print(f"Poker bot ready! Shards: {SHARD_IDS}" if SHARD_COUNT else "Poker bot ready!")
 
 @client.event
+@timed(message_seconds)
 async def on_message(message):
     if message.author == client.user:
         return
 
-    if len(message.content.split()) == 0:
+    command, args = parse_command(message.content)
+    if command is None:
         return
 
     # if message.channel.is_private:
         # return
 
-    command = message.content.split()[0]
     channel = message.channel
+    # The command message is deleted while the command runs, and the reply
+    # is sent alongside the hand DMs, so they cost one round trip.
+    replies = [asyncio.ensure_future(message.delete())]
 
-    if command[0] == '!' and command[1] == 'p':
-        await message.delete()
-
-        if command not in commands:
-            embed = discord.Embed(
-                description=f"{message.content} is not a valid command. "
-                             "Message !pkr-help to see the list of commands.",
-                color=0x00ff00
-            )
-
-            await channel.send(embed=embed, delete_after=60)
-            return
-
-        game = games.setdefault(message.channel, Game())
-        messages = commands[command][1](game, message)
-
-        if command == '!pkr-deal' and messages[0] == 'The hands have been dealt!':
-            await game.tell_hands(message.channel)
-
+    if command not in commands:
         embed = discord.Embed(
-            description='\n'.join(messages),
+            description=f"{message.content} is not a valid command. "
+                         "Message !pkr-help to see the list of commands.",
             color=0x00ff00
         )
 
-        await channel.send(embed=embed, delete_after=60)
+        await asyncio.gather(*replies, channel.send(embed=embed, delete_after=60))
+        return
 
-client.run(DISCORD_TOKEN)
\ No newline at end of file
+    # Commands for a table run one at a time, replies included, so a game is
+    # never changed while another command for it is waiting on Discord and
+    # the replies come out in the order the commands were handled.
+    started = time.perf_counter()
+    async with table_locks[channel.id] as lock:
+        LOCK_WAIT_SECONDS.observe(lock.last_wait)
+        LOCK_DEPTH.observe(lock.last_depth)
+        if lock.last_wait > SLOW_TABLE_WAIT:
+            print(f"Table {channel.id} is busy: {lock.stats()}")
+
+        game = await tables.get(channel.id)
+        await resolve_users(game, message.author)
+        in_hand, showdown = game.state in HAND_STATES, game.last_showdown
+        messages = commands[command].Action(game, message, args)
+        record_hand(game, in_hand, showdown)
+        snapshot_writer.mark_dirty(channel.id, game)
+        watch_timers(channel.id, game)
+
+        # The hand DMs read the cards before their first await, so retries
+        # of failed DMs can go on without holding up the table.
+        if command == '!pkr-deal' and messages[0] == 'The hands have been dealt!':
+            run_in_background(game.tell_hands(channel))
+
+        # What the players are told has happened is on disk first, so it
+        # outlives the bot's process.
+        await action_log.flush()
+        await send_messages(channel, game, messages, replies, command in INFO_COMMANDS)
+    command_seconds[command].observe(time.perf_counter() - started)
+
+# Workers that import this module, e.g. the odds workers under the spawn
+# start method, must not start another client.
+if __name__ == "__main__":
+    client.run(DISCORD_TOKEN)
+    action_log.close()
@@ -0,0 +1,41 @@
+import argparse
+import sys
+
+from utils.simulation import STRATEGIES, Simulator
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Play poker games headless with "
+                                                 "scripted players.")
+    parser.add_argument("--players", nargs="+", default=["passive", "random", "aggressive",
+                                                         "tight"],
+                        choices=sorted(STRATEGIES),
+                        help="one strategy per seat")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--max-hands", type=int, default=500,
+                        help="hands per game before it is abandoned")
+    parser.add_argument("--buy-in", type=int, default=500)
+    parser.add_argument("--blind", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    simulator = Simulator([STRATEGIES[name] for name in args.players],
+                          {"Buy-in": args.buy_in, "Starting-blind": args.blind,
+                           "Raise-delay": 0},
+                          args.seed)
+    result = simulator.run(args.games, args.max_hands)
+
+    print(f"Played {result.Games} games, {result.Hands} hands and {result.Actions} actions "
+          f"in {result.Seconds:.2f}s.")
+    print(f"{result.Hands / result.Seconds:.0f} hands/s, "
+          f"{result.Actions / result.Seconds:.0f} actions/s.")
+
+    for violation in result.Violations[:20]:
+        print(violation)
+    print(f"{len(result.Violations)} invariant violations.")
+
+    return 1 if result.Violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+import argparse
+import asyncio
+import itertools
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import WSMsgType, web
+
+from utils.sharding import shard_for_guild
+
+
+# A small stand-in for Discord's gateway and REST API, so the sharded
+# deployment can be run locally. It speaks enough of the protocol for
+# discord.py to log in, identify each shard and receive messages; messages
+# sent by the bot are kept in memory. Point the bot at it with
+# DISCORD_API=http://host:port/api/v7 and any DISCORD_TOKEN.
+
+BOT_ID = 1 << 40
+API = "/api/v7"
+
+
+def user_data(user_id: int, name: str, bot: bool = False) -> Dict:
+    return {"id": str(user_id), "username": name, "discriminator": "0001",
+            "avatar": None, "bot": bot}
+
+
+def guild_data(guild_id: int, channel_ids: List[int]) -> Dict:
+    return {
+        "id": str(guild_id),
+        "name": f"Guild {guild_id}",
+        "owner_id": str(BOT_ID),
+        "unavailable": False,
+        "member_count": 1,
+        "roles": [{"id": str(guild_id), "name": "@everyone", "permissions": "8",
+                   "position": 0, "color": 0, "hoist": False, "managed": False,
+                   "mentionable": False}],
+        "channels": [{"id": str(channel_id), "type": 0, "name": f"poker-{channel_id}",
+                      "position": i, "permission_overwrites": []}
+                     for i, channel_id in enumerate(channel_ids)],
+        "members": [],
+        "emojis": [],
+        "features": [],
+    }
+
+
+def json_response(data: Dict) -> web.Response:
+    # discord.py only decodes bodies whose content type is exactly this.
+    return web.Response(body=json.dumps(data).encode(), content_type="application/json")
+
+
+class StandInGateway:
+    guilds: Dict[int, List[int]]
+    shard_count: int
+    sessions: Dict[int, web.WebSocketResponse]
+    identified: List[Tuple[int, int]]
+    sent: List[Dict]
+    deleted: List[int]
+
+    def __init__(self, guilds: Dict[int, List[int]], shard_count: int,
+                 host: str = "127.0.0.1", port: int = 0) -> None:
+        self.guilds = guilds
+        self.shard_count = shard_count
+        self.host = host
+        self.port = port
+        self.sessions = {}
+        self.sequences: Dict[int, itertools.count] = {}
+        self.identified = []
+        self.sent = []
+        self.deleted = []
+        self.ids = itertools.count(BOT_ID + 1)
+        self.runner: web.AppRunner = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}{API}"
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get(API + "/users/@me", self.me)
+        app.router.add_get(API + "/gateway", self.gateway)
+        app.router.add_get(API + "/gateway/bot", self.gateway)
+        app.router.add_get(API + "/users/{user_id}", self.user)
+        app.router.add_post(API + "/users/@me/channels", self.dm_channel)
+        app.router.add_post(API + "/channels/{channel_id}/messages", self.create_message)
+        app.router.add_patch(API + "/channels/{channel_id}/messages/{message_id}",
+                             self.edit_message)
+        app.router.add_delete(API + "/channels/{channel_id}/messages/{message_id}",
+                              self.delete_message)
+        app.router.add_put(API + "/channels/{channel_id}/pins/{message_id}", self.no_content)
+        app.router.add_delete(API + "/channels/{channel_id}/pins/{message_id}", self.no_content)
+        app.router.add_get("/ws", self.websocket)
+
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        for session in list(self.sessions.values()):
+            await session.close()
+        await self.runner.cleanup()
+
+    async def me(self, request: web.Request) -> web.Response:
+        return json_response(user_data(BOT_ID, "Poker Bot", bot=True))
+
+    async def gateway(self, request: web.Request) -> web.Response:
+        return json_response({
+            "url": f"ws://{self.host}:{self.port}/ws",
+            "shards": self.shard_count,
+            "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0,
+                                    "max_concurrency": 1},
+        })
+
+    async def user(self, request: web.Request) -> web.Response:
+        user_id = int(request.match_info["user_id"])
+        return json_response(user_data(user_id, f"Player {user_id}"))
+
+    async def dm_channel(self, request: web.Request) -> web.Response:
+        recipient = int((await request.json())["recipient_id"])
+        return json_response({"id": str(recipient + 1), "type": 1,
+                              "recipients": [user_data(recipient, f"Player {recipient}")]})
+
+    def message_data(self, channel_id: int, content: str, author: Dict,
+                     embeds: List[Dict] = None, guild_id: int = None) -> Dict:
+        data = {
+            "id": str(next(self.ids)),
+            "channel_id": str(channel_id),
+            "author": author,
+            "content": content,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": embeds or [],
+            "pinned": False,
+            "type": 0,
+        }
+        if guild_id is not None:
+            data["guild_id"] = str(guild_id)
+            data["member"] = {"roles": [], "joined_at": data["timestamp"],
+                              "deaf": False, "mute": False}
+        return data
+
+    async def create_message(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        data = self.message_data(int(request.match_info["channel_id"]),
+                                 payload.get("content") or "",
+                                 user_data(BOT_ID, "Poker Bot", bot=True),
+                                 [payload["embed"]] if payload.get("embed") else [])
+        self.sent.append(data)
+        return json_response(data)
+
+    async def edit_message(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        data = self.message_data(int(request.match_info["channel_id"]),
+                                 payload.get("content") or "",
+                                 user_data(BOT_ID, "Poker Bot", bot=True),
+                                 [payload["embed"]] if payload.get("embed") else [])
+        data["id"] = request.match_info["message_id"]
+        return json_response(data)
+
+    async def delete_message(self, request: web.Request) -> web.Response:
+        self.deleted.append(int(request.match_info["message_id"]))
+        return web.Response(status=204)
+
+    async def no_content(self, request: web.Request) -> web.Response:
+        return web.Response(status=204)
+
+    async def websocket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        shard_id: Optional[int] = None
+
+        await ws.send_json({"op": 10, "d": {"heartbeat_interval": 41250}})
+
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                continue
+            payload = json.loads(message.data)
+
+            if payload["op"] == 1:
+                await ws.send_json({"op": 11})
+            elif payload["op"] == 2:
+                shard_id, shard_count = payload["d"].get("shard", [0, 1])
+                self.identified.append((shard_id, shard_count))
+                self.sessions[shard_id] = ws
+                self.sequences[shard_id] = itertools.count(1)
+                guilds = [guild_data(guild_id, channels)
+                          for guild_id, channels in self.guilds.items()
+                          if shard_for_guild(guild_id, shard_count) == shard_id]
+                ready = {
+                    "v": 6,
+                    "user": user_data(BOT_ID, "Poker Bot", bot=True),
+                    "guilds": guilds,
+                    "private_channels": [],
+                    "session_id": f"session-{shard_id}",
+                    "shard": [shard_id, shard_count],
+                }
+                await ws.send_json({"op": 0, "t": "READY", "s": next(self.sequences[shard_id]),
+                                    "d": ready})
+            elif payload["op"] == 6:
+                # Sessions can't be resumed here, so the shard identifies again.
+                await ws.send_json({"op": 9, "d": False})
+
+        if shard_id is not None and self.sessions.get(shard_id) is ws:
+            del self.sessions[shard_id]
+        return ws
+
+    async def say(self, guild_id: int, channel_id: int, user_id: int, content: str) -> bool:
+        # Sends a message to the shard that owns the guild, like Discord would.
+        shard_id = shard_for_guild(guild_id, self.shard_count)
+        ws = self.sessions.get(shard_id)
+        if ws is None or ws.closed:
+            return False
+
+        data = self.message_data(channel_id, content, user_data(user_id, f"Player {user_id}"),
+                                 guild_id=guild_id)
+        await ws.send_json({"op": 0, "t": "MESSAGE_CREATE",
+                            "s": next(self.sequences[shard_id]), "d": data})
+        return True
+
+    def replies(self, channel_id: int) -> List[str]:
+        return [embed.get("description", "")
+                for message in self.sent if int(message["channel_id"]) == channel_id
+                for embed in message["embeds"]]
+
+
+async def serve(port: int, shard_count: int, guilds: int) -> None:
+    gateway = StandInGateway({guild << 22: [(guild << 22) + 1] for guild in range(guilds)},
+                             shard_count, port=port)
+    await gateway.start()
+    print(f"Stand-in gateway on {gateway.url} with {shard_count} shards and {guilds} guilds.")
+    while True:
+        await asyncio.sleep(3600)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the Discord "
+                                                 "gateway.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--shards", type=int, default=2)
+    parser.add_argument("--guilds", type=int, default=4)
+    args = parser.parse_args()
+
+    asyncio.get_event_loop().run_until_complete(serve(args.port, args.shards, args.guilds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import argparse
+import os
+import sys
+
+from utils.sharding import Supervisor
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the poker bot as several worker "
+                                                 "processes, each owning some of the "
+                                                 "gateway shards.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shards", type=int, default=None,
+                        help="total number of gateway shards, defaults to --workers")
+    parser.add_argument("--restart-delay", type=float, default=1.0)
+    args = parser.parse_args()
+
+    shards = args.shards or args.workers
+    if shards < args.workers:
+        parser.error("every worker needs at least one shard")
+
+    bot = os.path.join(os.path.dirname(os.path.abspath(__file__)), "poker_bot.py")
+    return Supervisor([sys.executable, bot], args.workers, shards, args.restart_delay).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
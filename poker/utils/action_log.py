@@ -0,0 +1,259 @@
+import asyncio
+import itertools
+import json
+import os
+import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, Iterator, List, Tuple
+
+from models.game import Game
+from models.replay import replay, snapshot_event
+from models.snapshot import dump_game, load_game
+
+MAX_OPEN_LOGS = 256
+SEGMENT_NAME = re.compile(r"^(-?\d+)(?:\.(\d+))?\.log$")
+
+
+class ActionLog:
+    # One append-only log per channel, one compact JSON event per line.
+    # Events are buffered in memory and written on the log's own thread, to
+    # files that are kept open, every interval and before a reply is sent.
+    # When a log has grown past max_bytes it moves to a new segment at the
+    # start of the next game, and only the segment before the current one
+    # is kept.
+    directory: str
+    segments: Dict[int, int]
+    sizes: Dict[int, int]
+    seqs: Dict[int, int]
+    pending: Dict[Tuple[int, int], List[bytes]]
+
+    def __init__(self, directory: str, max_bytes: int = 4 << 20) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="action-log")
+        self.files: "OrderedDict[int, Tuple[int, BinaryIO]]" = OrderedDict()
+        self.sizes = {}
+        self.seqs = {}
+        self.pending = {}
+        # One write at a time, so lines that failed stay ahead of later ones.
+        self.lock = asyncio.Lock()
+        self.task: asyncio.Task = None
+
+        self.segments = {}
+        for name in os.listdir(directory):
+            match = SEGMENT_NAME.match(name)
+            if match:
+                channel_id, segment = int(match.group(1)), int(match.group(2) or 0)
+                self.segments[channel_id] = max(self.segments.get(channel_id, 0), segment)
+
+    def path(self, channel_id: int, segment: int = 0) -> str:
+        name = f"{channel_id}.log" if segment == 0 else f"{channel_id}.{segment}.log"
+        return os.path.join(self.directory, name)
+
+    def size(self, channel_id: int) -> int:
+        # Of the current segment, counting events not written yet.
+        if channel_id not in self.sizes:
+            self.sizes[channel_id] = self.repair(self.path(channel_id,
+                                                           self.segments.get(channel_id, 0)))
+        return self.sizes[channel_id]
+
+    def repair(self, path: str) -> int:
+        # A crash while a line was being written leaves it cut short. It is
+        # cut off before anything else is appended, or the next event would
+        # be written onto the end of it and lost with it.
+        try:
+            file = open(path, "r+b")
+        except FileNotFoundError:
+            return 0
+
+        with file:
+            end = cut = file.seek(0, os.SEEK_END)
+            while cut > 0:
+                start = max(cut - 4096, 0)
+                file.seek(start)
+                chunk = file.read(cut - start)
+                if b"\n" in chunk:
+                    cut = start + chunk.rindex(b"\n") + 1
+                    break
+                cut = start
+
+            if cut != end:
+                print(f"Cut {end - cut} bytes of a line left unfinished off {path}")
+                file.truncate(cut)
+            return cut
+
+    def append(self, channel_id: int, event: List) -> Tuple[int, int]:
+        # Returns the segment and offset the log will have once the event is
+        # written.
+        if event[1] == "new" and self.size(channel_id) > self.max_bytes:
+            self.segments[channel_id] = self.segments.get(channel_id, 0) + 1
+            self.sizes[channel_id] = 0
+
+        segment = self.segments.get(channel_id, 0)
+        line = (json.dumps(event, separators=(",", ":"), ensure_ascii=False) + "\n").encode()
+        self.pending.setdefault((channel_id, segment), []).append(line)
+        self.seqs[channel_id] = event[0]
+        self.sizes[channel_id] = self.size(channel_id) + len(line)
+        return segment, self.sizes[channel_id]
+
+    def start(self, interval: float = 0.5) -> None:
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run(interval))
+
+    async def run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    async def flush(self) -> bool:
+        # Whether everything logged so far has been written.
+        async with self.lock:
+            if not self.pending:
+                return True
+
+            pending, self.pending = self.pending, {}
+            loop = asyncio.get_event_loop()
+            try:
+                await loop.run_in_executor(self.executor, self.write, pending)
+            except OSError as error:
+                print(f"Failed to write the action log: {error}")
+                # Kept ahead of anything logged since, for the next attempt.
+                for key, lines in self.pending.items():
+                    pending.setdefault(key, []).extend(lines)
+                self.pending = pending
+                return False
+            return True
+
+    def write(self, pending: Dict[Tuple[int, int], List[bytes]]) -> None:
+        # Runs on the log's thread, which owns the open files.
+        for (channel_id, segment), lines in pending.items():
+            self.file(channel_id, segment).write(b"".join(lines))
+        for _, file in self.files.values():
+            file.flush()
+
+    def file(self, channel_id: int, segment: int) -> BinaryIO:
+        open_segment, file = self.files.pop(channel_id, (None, None))
+        if open_segment != segment:
+            if file is not None:
+                file.close()
+            file = open(self.path(channel_id, segment), "ab")
+            if segment >= 2 and os.path.exists(self.path(channel_id, segment - 2)):
+                os.remove(self.path(channel_id, segment - 2))
+        self.files[channel_id] = (segment, file)
+
+        while len(self.files) > MAX_OPEN_LOGS:
+            _, (_, oldest) = self.files.popitem(last=False)
+            oldest.close()
+        return file
+
+    def close(self) -> None:
+        # Writes what is left once the event loop has stopped, after any
+        # write still running on the log's thread.
+        self.executor.shutdown()
+        pending, self.pending = self.pending, {}
+        self.write(pending)
+        for _, file in self.files.values():
+            file.close()
+        self.files.clear()
+
+    def delete(self, channel_id: int) -> None:
+        # Drops the log of a table that was cleared. Its files are removed on
+        # the log's thread, after any write to them still running there.
+        for key in [key for key in self.pending if key[0] == channel_id]:
+            del self.pending[key]
+        segment = self.segments.pop(channel_id, 0)
+        self.sizes[channel_id] = 0
+        self.seqs.pop(channel_id, None)
+        self.executor.submit(self.remove, channel_id, segment)
+
+    def remove(self, channel_id: int, segment: int) -> None:
+        _, file = self.files.pop(channel_id, (None, None))
+        try:
+            if file is not None:
+                file.close()
+            for old in (segment - 1, segment):
+                if old >= 0 and os.path.exists(self.path(channel_id, old)):
+                    os.remove(self.path(channel_id, old))
+        except OSError as error:
+            print(f"Failed to remove the action log of {channel_id}: {error}")
+
+    def attach(self, channel_id: int, game: Game) -> None:
+        # A table that existed before its log did starts the log with a full
+        # snapshot, so the log can always be replayed from its first line.
+        if game.recorder is None:
+            if self.size(channel_id) == 0 and game.players:
+                game.log_seq += 1
+                game.log_segment, game.log_offset = self.append(channel_id,
+                                                                snapshot_event(game))
+            # Sequence numbers keep counting up across games on the same
+            # channel, so a checkpoint never skips events of a later game.
+            # A log this process has not written to yet was replayed by
+            # recover, which leaves the game at its last sequence number.
+            game.log_seq = max(game.log_seq, self.seqs.get(channel_id, 0))
+            game.recorder = lambda event: self.append(channel_id, event)
+
+    def recover(self, channel_id: int, game: Game) -> Game:
+        # Brings a restored snapshot up to date with the events logged after
+        # it was taken, then keeps logging. The snapshot's sequence number
+        # carries on across games, so later events are never skipped.
+        self.size(channel_id)
+        start = (game.log_seq, game.log_segment, game.log_offset)
+        restored = dump_game(game)
+        events = self.events(channel_id, *start)
+        try:
+            replay(game, events)
+        except Exception as error:
+            # The table still loads, as it was before the event that failed,
+            # and carries on from a snapshot of that, so a bad line or an
+            # event this version can't replay never locks the channel.
+            failed = game.log_seq + 1
+            print(f"Failed to replay event {failed} of the action log of {channel_id}: "
+                  f"{error!r}")
+            last = max([failed] + [event[0] for event in events])
+            game = replay(load_game(restored), itertools.takewhile(
+                lambda event: event[0] < failed, self.events(channel_id, *start)
+            ))
+            game.log_seq = last + 1
+            self.append(channel_id, snapshot_event(game))
+
+        game.log_segment = self.segments.get(channel_id, 0)
+        game.log_offset = self.size(channel_id)
+        self.attach(channel_id, game)
+        return game
+
+    def events(self, channel_id: int, after_seq: int = 0, segment: int = None,
+               offset: int = 0) -> Iterator[List]:
+        # From the given segment and offset, or from the oldest segment kept.
+        current = self.segments.get(channel_id, 0)
+        if segment is None:
+            segment, offset = max(current - 1, 0), 0
+
+        for number in range(segment, current + 1):
+            try:
+                file = open(self.path(channel_id, number), encoding="utf-8")
+            except FileNotFoundError:
+                continue
+
+            with file:
+                file.seek(offset if number == segment else 0)
+                for line in file:
+                    if not line.endswith("\n"):
+                        # Still being written, or cut short by a crash.
+                        return
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        event = None
+                    if event is not None and event[0] <= after_seq:
+                        continue
+
+                    # Replaying past a missing event would build a different
+                    # game, so the log is only read up to it.
+                    if event is None or after_seq and event[0] != after_seq + 1:
+                        print(f"The action log of {channel_id} is broken after event "
+                              f"{after_seq}: {line[:80]!r}")
+                        return
+                    after_seq = event[0]
+                    yield event
@@ -0,0 +1,93 @@
+from typing import Sequence
+
+import numpy as np
+
+from models.card import Card
+from utils.evaluator import (BIT_COUNT, FLUSH_BASE, FOUR_OF_KIND_BASE, FULL_HOUSE_BASE,
+                             HIGH_CARD_BASE, HIGHEST, PAIR_BASE, STRAIGHT_BASE,
+                             STRAIGHT_FLUSH_BASE, STRAIGHT_TABLE, THREE_OF_KIND_BASE,
+                             TOP_FIVE, TWO_PAIR_BASE)
+
+
+# Vectorized twin of evaluator.seven_card_strength. Hands are rows of card
+# ids (suit * 13 + rank), and every row gets exactly the strength the scalar
+# evaluator would give it.
+_STRAIGHT = np.array(STRAIGHT_TABLE, dtype=np.int64)
+_BIT_COUNT = np.array(BIT_COUNT, dtype=np.int64)
+_HIGHEST = np.array(HIGHEST, dtype=np.int64)
+_TOP_FIVE = np.array(TOP_FIVE, dtype=np.int64)
+# Indexed by rank + 1 so that a missing rank (-1) maps to an empty mask.
+_RANK_BIT = np.array([0] + [1 << rank for rank in range(13)], dtype=np.int64)
+
+SUIT_MASK = 0x1FFF
+# Rows per pass, small enough for the temporaries to stay in cache.
+CHUNK_SIZE = 32768
+
+
+def card_ids(hands: Sequence[Sequence[Card]]) -> np.ndarray:
+    return np.array([[card.id for card in hand] for hand in hands], dtype=np.int64)
+
+
+def evaluate_batch(hands: np.ndarray) -> np.ndarray:
+    hands = np.asarray(hands, dtype=np.int64)
+    strengths = np.empty(len(hands), dtype=np.int64)
+
+    for start in range(0, len(hands), CHUNK_SIZE):
+        strengths[start:start + CHUNK_SIZE] = _evaluate_chunk(hands[start:start + CHUNK_SIZE])
+
+    return strengths
+
+
+def _evaluate_chunk(hands: np.ndarray) -> np.ndarray:
+    card_masks = np.bitwise_or.reduce(np.left_shift(1, hands), axis=1)
+
+    s0 = card_masks & SUIT_MASK
+    s1 = (card_masks >> 13) & SUIT_MASK
+    s2 = (card_masks >> 26) & SUIT_MASK
+    s3 = (card_masks >> 39) & SUIT_MASK
+
+    # Ranks held in at least n suits, i.e. appearing at least n times.
+    seen1 = s0 | s1 | s2 | s3
+    seen2 = (s0 & s1) | (s0 & s2) | (s0 & s3) | (s1 & s2) | (s1 & s3) | (s2 & s3)
+    seen3 = (s0 & s1 & s2) | (s0 & s1 & s3) | (s0 & s2 & s3) | (s1 & s2 & s3)
+    seen4 = s0 & s1 & s2 & s3
+
+    flush_mask = np.zeros_like(seen1)
+    for suit_mask in (s0, s1, s2, s3):
+        flush_mask = np.where(_BIT_COUNT[suit_mask] >= 5, suit_mask, flush_mask)
+
+    flush_high = _STRAIGHT[flush_mask]
+    straight_high = _STRAIGHT[seen1]
+
+    quad = _HIGHEST[seen4]
+    trip = _HIGHEST[seen3]
+    trip_bit = _RANK_BIT[trip + 1]
+    full_pair = _HIGHEST[seen2 ^ trip_bit]
+    pair = _HIGHEST[seen2]
+    pair_bit = _RANK_BIT[pair + 1]
+    second = _HIGHEST[seen2 ^ pair_bit]
+    second_bit = _RANK_BIT[second + 1]
+
+    conditions = [
+        flush_high >= 0,
+        quad >= 0,
+        (trip >= 0) & (full_pair >= 0),
+        flush_mask > 0,
+        straight_high >= 0,
+        trip >= 0,
+        second >= 0,
+        pair >= 0,
+    ]
+    choices = [
+        STRAIGHT_FLUSH_BASE | flush_high << 16,
+        FOUR_OF_KIND_BASE | quad << 16 | _HIGHEST[seen1 ^ _RANK_BIT[quad + 1]] << 12,
+        FULL_HOUSE_BASE | trip << 16 | full_pair << 12,
+        FLUSH_BASE | _TOP_FIVE[flush_mask],
+        STRAIGHT_BASE | straight_high << 16,
+        THREE_OF_KIND_BASE | trip << 16 | (_TOP_FIVE[seen1 ^ trip_bit] >> 4) & 0xFF00,
+        TWO_PAIR_BASE | pair << 16 | second << 12
+        | (_TOP_FIVE[seen1 ^ pair_bit ^ second_bit] >> 8) & 0xF00,
+        PAIR_BASE | pair << 16 | (_TOP_FIVE[seen1 ^ pair_bit] >> 4) & 0xFFF0,
+    ]
+
+    return np.select(conditions, choices, HIGH_CARD_BASE | _TOP_FIVE[seen1])
@@ -0,0 +1,32 @@
+from typing import Dict, List
+
+from utils.poker_constants import RANKS, SUITS
+
+
+# Bit layout of an encoded card (Cactus Kev style):
+#   bits 16-28  one bit per rank, used to build rank masks with a plain OR
+#   bits 12-15  one bit per suit, a flush is an AND of all five cards != 0
+#   bits  8-11  rank value (0 for deuce, 12 for ace)
+#   bits  0-7   prime number per rank, products identify paired hands
+PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+RANK_MASK_SHIFT = 16
+SUIT_BITS = 0xF000
+PRIME_BITS = 0xFF
+
+
+def encode_card(rank_value: int, suit_index: int) -> int:
+    return ((1 << (RANK_MASK_SHIFT + rank_value)) | (1 << (12 + suit_index))
+            | (rank_value << 8) | PRIMES[rank_value])
+
+
+def card_id(suit: str, rank: str) -> int:
+    return SUITS.index(suit) * 13 + RANKS[rank].Value
+
+
+# Card ids run from 0 to 51 as suit * 13 + rank, so both the encodings and
+# any per-card table can be indexed directly by id, and the 13 bits of a
+# suit stay contiguous in a 52-bit mask of card ids.
+CARD_IDS: Dict[str, int] = {suit + rank: card_id(suit, rank)
+                            for suit in SUITS for rank in RANKS}
+ENCODED_CARDS: List[int] = [encode_card(i % 13, i // 13) for i in range(52)]
@@ -0,0 +1,46 @@
+import asyncio
+from typing import Iterable, List, Optional, Tuple
+
+import discord
+
+
+# Discord limits each route on its own and discord.py already waits out the
+# 429s it sees, but it gives up after a few tries and never retries a 5xx.
+# These helpers bound how many DMs are in flight at once, retry the
+# failures that are worth retrying and turn the rest into a message that
+# can be shown to the table.
+
+DM_CONCURRENCY = 4
+DM_ATTEMPTS = 3
+RETRY_DELAY = 0.5
+
+
+async def send_direct(user: discord.User, embed: discord.Embed,
+                      semaphore: asyncio.Semaphore) -> Optional[str]:
+    # A player who couldn't be fetched since a restart has nothing to send to.
+    if not hasattr(user, "send"):
+        return f"{user.name} couldn't be reached for a direct message."
+
+    async with semaphore:
+        for attempt in range(DM_ATTEMPTS):
+            try:
+                await user.send(embed=embed)
+                return None
+            except discord.Forbidden:
+                return f"{user.name} doesn't accept direct messages from this server."
+            except discord.HTTPException as error:
+                if error.status != 429 and error.status < 500 or attempt == DM_ATTEMPTS - 1:
+                    return f"A direct message to {user.name} failed ({error.status})."
+
+                delay = RETRY_DELAY * 2 ** attempt
+                if error.status == 429:
+                    delay = float(error.response.headers.get("Retry-After", delay))
+                await asyncio.sleep(delay)
+
+
+async def send_all(messages: Iterable[Tuple[discord.User, discord.Embed]],
+                   concurrency: int = DM_CONCURRENCY) -> List[str]:
+    semaphore = asyncio.Semaphore(concurrency)
+    results = await asyncio.gather(*[send_direct(user, embed, semaphore)
+                                     for user, embed in messages])
+    return [error for error in results if error is not None]
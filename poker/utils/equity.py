@@ -0,0 +1,89 @@
+import asyncio
+import math
+import time
+from collections import namedtuple
+from concurrent.futures import Executor
+from typing import List, Tuple
+
+import numpy as np
+
+from utils.batch_evaluator import evaluate_batch
+
+
+Equity = namedtuple("Equity", ["Win", "Tie", "Share", "Margin", "Samples"])
+
+# Runouts sampled per executor job, and the z-score of the reported margin.
+BATCH_SIZE = 2000
+CONFIDENCE_Z = 1.96
+
+
+def sample_equity(hole: List[int], board: List[int], unknown: List[int],
+                  opponents: int, samples: int, seed: int) -> Tuple[int, int, int, float, float]:
+    rng = np.random.default_rng(seed)
+    missing = 5 - len(board)
+    draws = rng.permuted(np.tile(np.array(unknown, dtype=np.int64), (samples, 1)),
+                         axis=1)[:, :missing + 2 * opponents]
+
+    boards = np.hstack([np.tile(np.array(board, dtype=np.int64), (samples, 1)),
+                        draws[:, :missing]])
+    hands = [np.hstack([np.tile(np.array(hole, dtype=np.int64), (samples, 1)), boards])]
+    for opponent in range(opponents):
+        start = missing + 2 * opponent
+        hands.append(np.hstack([draws[:, start:start + 2], boards]))
+
+    strengths = evaluate_batch(np.vstack(hands)).reshape(opponents + 1, samples)
+    best = strengths.max(axis=0)
+    leaders = (strengths == best).sum(axis=0)
+    ahead = strengths[0] == best
+    share = np.where(ahead, 1 / leaders, 0.0)
+
+    return (samples, int((ahead & (leaders == 1)).sum()), int((ahead & (leaders > 1)).sum()),
+            float(share.sum()), float((share * share).sum()))
+
+
+async def estimate_equity(executor: Executor, workers: int, hole: List[int],
+                          board: List[int], unknown: List[int], opponents: int,
+                          max_samples: int, time_budget: float, margin: float) -> Equity:
+    if opponents == 0:
+        return Equity(1.0, 0.0, 1.0, 0.0, 0)
+
+    loop = asyncio.get_event_loop()
+    deadline = time.monotonic() + time_budget
+    totals = [0, 0, 0, 0.0, 0.0]
+    pending = set()
+    submitted = 0
+    seed = time.time_ns()
+
+    while True:
+        while len(pending) < workers and (submitted < max_samples or submitted == 0):
+            samples = max(min(BATCH_SIZE, max_samples - submitted), 1)
+            pending.add(loop.run_in_executor(executor, sample_equity, hole, board, unknown,
+                                             opponents, samples, seed + submitted))
+            submitted += samples
+
+        if not pending:
+            break
+
+        # Always wait for the first batch, however small the time budget is.
+        timeout = max(deadline - time.monotonic(), 0) if totals[0] else None
+        done, pending = await asyncio.wait(pending, timeout=timeout,
+                                           return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            for i, value in enumerate(future.result()):
+                totals[i] += value
+
+        if time.monotonic() >= deadline or _margin(totals) <= margin:
+            break
+
+    for future in pending:
+        future.cancel()
+
+    samples, wins, ties, share, _ = totals
+    return Equity(wins / samples, ties / samples, share / samples, _margin(totals), samples)
+
+
+def _margin(totals: List) -> float:
+    samples, _, _, share, share_squared = totals
+    mean = share / samples
+    variance = max(share_squared / samples - mean * mean, 0.0)
+    return CONFIDENCE_Z * math.sqrt(variance / samples)
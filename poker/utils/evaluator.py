@@ -0,0 +1,212 @@
+from itertools import combinations, combinations_with_replacement
+from typing import Dict, List, Sequence, Tuple
+
+from utils.card_encoding import PRIME_BITS, PRIMES, RANK_MASK_SHIFT, SUIT_BITS
+from utils.ranking_constants import Ranking
+
+
+# A hand strength is a single int: the ranking in the top bits followed by
+# five 4-bit rank values in the order they are compared. Higher is better,
+# and two hands compare exactly like the equivalent Hand objects.
+RANKING_SHIFT = 20
+ACE = 12
+WHEEL_MASK = 0b1000000001111
+
+
+def pack_strength(ranking: Ranking, ranks: Sequence[int]) -> int:
+    strength = ranking.value
+    for rank in ranks:
+        strength = (strength << 4) | rank
+    return strength << (4 * (5 - len(ranks)))
+
+
+def strength_ranking(strength: int) -> Ranking:
+    return Ranking(strength >> RANKING_SHIFT)
+
+
+def straight_high(rank_mask: int) -> int:
+    for high in range(ACE, 3, -1):
+        straight = 0b11111 << (high - 4)
+        if rank_mask & straight == straight:
+            return high
+    if rank_mask & WHEEL_MASK == WHEEL_MASK:
+        return 3
+    return -1
+
+
+def _build_tables():
+    flushes = [0] * (1 << 13)
+    unique = [0] * (1 << 13)
+    products: Dict[int, int] = {}
+
+    for ranks in combinations(range(13), 5):
+        mask = sum(1 << rank for rank in ranks)
+        high = straight_high(mask)
+        descending = ranks[::-1]
+
+        if high >= 0:
+            flushes[mask] = pack_strength(Ranking.STRAIGHT_FLUSH, [high])
+            unique[mask] = pack_strength(Ranking.STRAIGHT, [high])
+        else:
+            flushes[mask] = pack_strength(Ranking.FLUSH, descending)
+            unique[mask] = pack_strength(Ranking.HIGH_CARD, descending)
+
+    for ranks in combinations_with_replacement(range(13), 5):
+        counts = {rank: ranks.count(rank) for rank in set(ranks)}
+        if len(counts) == 5 or max(counts.values()) == 5:
+            continue
+
+        groups = sorted(counts, key=lambda rank: (counts[rank], rank), reverse=True)
+        shape = [counts[rank] for rank in groups]
+
+        if shape[0] == 4:
+            ranking = Ranking.FOUR_OF_KIND
+        elif shape[0] == 3:
+            ranking = Ranking.FULL_HOUSE if shape[1] == 2 else Ranking.THREE_OF_KIND
+        elif shape[1] == 2:
+            ranking = Ranking.TWO_PAIR
+        else:
+            ranking = Ranking.PAIR
+
+        product = 1
+        for rank in ranks:
+            product *= PRIMES[rank]
+        products[product] = pack_strength(ranking, groups)
+
+    return flushes, unique, products
+
+
+FLUSH_TABLE, UNIQUE_TABLE, PRODUCT_TABLE = _build_tables()
+
+# Tables indexed by a 13-bit rank mask. TOP_FIVE holds the five highest ranks
+# packed the same way as the low 20 bits of a strength.
+STRAIGHT_TABLE = [straight_high(mask) for mask in range(1 << 13)]
+BIT_COUNT = [bin(mask).count("1") for mask in range(1 << 13)]
+HIGHEST = [mask.bit_length() - 1 for mask in range(1 << 13)]
+TOP_FIVE = [pack_strength(Ranking.HIGH_CARD, [rank for rank in range(ACE, -1, -1)
+                                              if mask >> rank & 1][:5]) & 0xFFFFF
+            for mask in range(1 << 13)]
+
+STRAIGHT_FLUSH_BASE = Ranking.STRAIGHT_FLUSH.value << RANKING_SHIFT
+FOUR_OF_KIND_BASE = Ranking.FOUR_OF_KIND.value << RANKING_SHIFT
+FULL_HOUSE_BASE = Ranking.FULL_HOUSE.value << RANKING_SHIFT
+FLUSH_BASE = Ranking.FLUSH.value << RANKING_SHIFT
+STRAIGHT_BASE = Ranking.STRAIGHT.value << RANKING_SHIFT
+THREE_OF_KIND_BASE = Ranking.THREE_OF_KIND.value << RANKING_SHIFT
+TWO_PAIR_BASE = Ranking.TWO_PAIR.value << RANKING_SHIFT
+PAIR_BASE = Ranking.PAIR.value << RANKING_SHIFT
+HIGH_CARD_BASE = Ranking.HIGH_CARD.value << RANKING_SHIFT
+
+
+def evaluate_five(cards: Sequence[int]) -> int:
+    c1, c2, c3, c4, c5 = cards
+    mask = (c1 | c2 | c3 | c4 | c5) >> RANK_MASK_SHIFT
+
+    if c1 & c2 & c3 & c4 & c5 & SUIT_BITS:
+        return FLUSH_TABLE[mask]
+
+    strength = UNIQUE_TABLE[mask]
+    if strength:
+        return strength
+
+    return PRODUCT_TABLE[(c1 & PRIME_BITS) * (c2 & PRIME_BITS) * (c3 & PRIME_BITS)
+                         * (c4 & PRIME_BITS) * (c5 & PRIME_BITS)]
+
+
+def seven_card_strength(cards: Sequence[int]) -> int:
+    # seen<n> holds the ranks that appear at least n times.
+    seen1 = seen2 = seen3 = seen4 = 0
+    suits = [0] * 16
+
+    for card in cards:
+        bit = card >> RANK_MASK_SHIFT
+        seen4 |= seen3 & bit
+        seen3 |= seen2 & bit
+        seen2 |= seen1 & bit
+        seen1 |= bit
+        suits[(card & SUIT_BITS) >> 12] |= bit
+
+    for flush_mask in (suits[1], suits[2], suits[4], suits[8]):
+        if BIT_COUNT[flush_mask] >= 5:
+            break
+    else:
+        flush_mask = 0
+
+    if flush_mask:
+        high = STRAIGHT_TABLE[flush_mask]
+        if high >= 0:
+            return STRAIGHT_FLUSH_BASE | high << 16
+
+    if seen4:
+        quad = HIGHEST[seen4]
+        return FOUR_OF_KIND_BASE | quad << 16 | HIGHEST[seen1 ^ (1 << quad)] << 12
+
+    if seen3:
+        trip = HIGHEST[seen3]
+        pairs = seen2 ^ (1 << trip)
+        if pairs:
+            return FULL_HOUSE_BASE | trip << 16 | HIGHEST[pairs] << 12
+
+    if flush_mask:
+        return FLUSH_BASE | TOP_FIVE[flush_mask]
+
+    high = STRAIGHT_TABLE[seen1]
+    if high >= 0:
+        return STRAIGHT_BASE | high << 16
+
+    if seen3:
+        return THREE_OF_KIND_BASE | trip << 16 | (TOP_FIVE[seen1 ^ (1 << trip)] >> 4) & 0xFF00
+
+    if seen2:
+        pair = HIGHEST[seen2]
+        second = HIGHEST[seen2 ^ (1 << pair)]
+        if second >= 0:
+            kickers = seen1 ^ (1 << pair) ^ (1 << second)
+            return TWO_PAIR_BASE | pair << 16 | second << 12 | (TOP_FIVE[kickers] >> 8) & 0xF00
+        return PAIR_BASE | pair << 16 | (TOP_FIVE[seen1 ^ (1 << pair)] >> 4) & 0xFFF0
+
+    return HIGH_CARD_BASE | TOP_FIVE[seen1]
+
+
+def strength_ranks(strength: int) -> List[int]:
+    ranking = strength_ranking(strength)
+    ranks = [(strength >> shift) & 0xF for shift in (16, 12, 8, 4, 0)]
+
+    if ranking in (Ranking.STRAIGHT, Ranking.STRAIGHT_FLUSH):
+        if ranks[0] == 3:
+            return [3, 2, 1, 0, ACE]
+        return list(range(ranks[0], ranks[0] - 5, -1))
+    if ranking == Ranking.FOUR_OF_KIND:
+        return ranks[:1] * 4 + ranks[1:2]
+    if ranking == Ranking.FULL_HOUSE:
+        return ranks[:1] * 3 + ranks[1:2] * 2
+    if ranking == Ranking.THREE_OF_KIND:
+        return ranks[:1] * 3 + ranks[1:3]
+    if ranking == Ranking.TWO_PAIR:
+        return ranks[:1] * 2 + ranks[1:2] * 2 + ranks[2:3]
+    if ranking == Ranking.PAIR:
+        return ranks[:1] * 2 + ranks[1:4]
+    return ranks
+
+
+def best_cards(cards: Sequence[int], strength: int) -> List[int]:
+    suit_bit = SUIT_BITS
+
+    if strength_ranking(strength) in (Ranking.FLUSH, Ranking.STRAIGHT_FLUSH):
+        for shift in range(12, 16):
+            if sum(1 for card in cards if card >> shift & 1) >= 5:
+                suit_bit = 1 << shift
+
+    best: List[int] = []
+    for rank in strength_ranks(strength):
+        for card in cards:
+            if (card >> 8) & 0xF == rank and card & suit_bit and card not in best:
+                best.append(card)
+                break
+
+    return best
+
+
+def evaluate_seven(cards: Sequence[int]) -> Tuple[int, List[int]]:
+    strength = seven_card_strength(cards)
+    return strength, best_cards(cards, strength)
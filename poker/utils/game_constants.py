@@ -8,8 +8,14 @@ Option = namedtuple("Option", ["Description", "Default"])
 GAME_OPTIONS: Dict[str, Option] = {
     "Blind": Option("The current price of the small blind", 5),
     "Buy-in": Option("The amount of chips all players start out with", 500),
+    "Odds-samples": Option("The most board runouts !pkr-odds will sample", 50000),
+    "Odds-time": Option("The milliseconds !pkr-odds may spend sampling", 2000),
     "Raise-delay": Option("The number of minutes before blinds double", 30),
-    "Starting-blind": Option("The starting price of the small blind", 5)
+    "Starting-blind": Option("The starting price of the small blind", 5),
+    "Turn-time": Option("The seconds a player has to act before they check or fold, "
+                        "0 to wait forever", 120),
+    "Table-view": Option("Set to 1 to show the table in one message edited after "
+                         "each action", 0)
 }
 
 class GameState(Enum):
@@ -21,3 +27,6 @@ class GameState(Enum):
     TURN_DEALT = 6
     RIVER_DEALT = 7
 
+HAND_STATES = (GameState.HANDS_DEALT, GameState.FLOP_DEALT,
+               GameState.TURN_DEALT, GameState.RIVER_DEALT)
+
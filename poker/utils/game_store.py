@@ -0,0 +1,138 @@
+import asyncio
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from models.game import Game
+from models.snapshot import dump_game
+from utils.action_log import ActionLog
+
+
+class GameStore:
+    # All access goes through one worker thread, which owns the connection.
+    path: str
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="game-store")
+        self.connection: sqlite3.Connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS games ("
+                                    "channel_id INTEGER PRIMARY KEY, "
+                                    "snapshot BLOB NOT NULL, "
+                                    "updated REAL NOT NULL)")
+            # The next turn deadline of each table, so timers can be set
+            # again after a restart without loading every snapshot.
+            self.connection.execute("CREATE TABLE IF NOT EXISTS deadlines ("
+                                    "channel_id INTEGER PRIMARY KEY, "
+                                    "deadline REAL NOT NULL)")
+        return self.connection
+
+    def load(self, channel_id: int) -> bytes:
+        row = self._connect().execute("SELECT snapshot FROM games WHERE channel_id = ?",
+                                      (channel_id,)).fetchone()
+        return row[0] if row else None
+
+    def deadlines(self) -> List[Tuple[int, float]]:
+        return self._connect().execute("SELECT channel_id, deadline FROM deadlines").fetchall()
+
+    def save_many(self, snapshots: Iterable[Tuple[int, bytes, Optional[float]]]) -> None:
+        now = time.time()
+        snapshots = list(snapshots)
+        with self._connect() as connection:
+            connection.executemany("INSERT OR REPLACE INTO games VALUES (?, ?, ?)",
+                                   [(channel_id, snapshot, now)
+                                    for channel_id, snapshot, _ in snapshots])
+            connection.executemany("DELETE FROM deadlines WHERE channel_id = ?",
+                                   [(channel_id,) for channel_id, _, deadline in snapshots
+                                    if deadline is None])
+            connection.executemany("INSERT OR REPLACE INTO deadlines VALUES (?, ?)",
+                                   [(channel_id, deadline)
+                                    for channel_id, _, deadline in snapshots
+                                    if deadline is not None])
+
+    def delete(self, channel_ids: Iterable[int]) -> None:
+        rows = [(channel_id,) for channel_id in channel_ids]
+        with self._connect() as connection:
+            connection.executemany("DELETE FROM games WHERE channel_id = ?", rows)
+            connection.executemany("DELETE FROM deadlines WHERE channel_id = ?", rows)
+
+    async def load_async(self, channel_id: int) -> bytes:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, self.load, channel_id)
+
+    async def deadlines_async(self) -> List[Tuple[int, float]]:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, self.deadlines)
+
+
+class SnapshotWriter:
+    # Commands only mark a table as dirty. Dirty tables are serialized on the
+    # event loop, so each snapshot is consistent, and written in one
+    # transaction on the store's thread every interval.
+    store: GameStore
+    interval: float
+    dirty: Dict[int, Game]
+    deleted: Set[int]
+
+    def __init__(self, store: GameStore, interval: float = 2.0,
+                 action_log: ActionLog = None) -> None:
+        self.store = store
+        self.interval = interval
+        self.action_log = action_log
+        self.dirty = {}
+        self.deleted = set()
+        self.task: asyncio.Task = None
+
+    def mark_dirty(self, channel_id: int, game: Game) -> None:
+        self.deleted.discard(channel_id)
+        self.dirty[channel_id] = game
+
+    def delete(self, channel_id: int) -> None:
+        # The table's rows go with the next batch. Until then it counts as
+        # deleted, so it isn't loaded again from the rows about to go.
+        self.dirty.pop(channel_id, None)
+        self.deleted.add(channel_id)
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self.dirty and not self.deleted:
+            return
+
+        dirty, self.dirty = self.dirty, {}
+        deleted = set(self.deleted)
+        try:
+            snapshots: List[Tuple[int, bytes, Optional[float]]] = [
+                (channel_id, dump_game(game), game.turn_deadline)
+                for channel_id, game in dirty.items()
+            ]
+
+            # A snapshot must never point past the end of its action log, or
+            # events logged after a crash would be skipped on recovery.
+            if self.action_log is not None and not await self.action_log.flush():
+                raise OSError("the action log could not be written")
+
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(self.store.executor, self.store.save_many, snapshots)
+            if deleted:
+                await loop.run_in_executor(self.store.executor, self.store.delete, deleted)
+                self.deleted -= deleted
+        except Exception as error:
+            # Anything but a crash of this loop, which would stop saving for good.
+            print(f"Failed to save {len(dirty)} tables: {error!r}")
+            for channel_id, game in dirty.items():
+                self.dirty.setdefault(channel_id, game)
@@ -3,7 +3,18 @@ from typing import List, Tuple
 
 from models.card import Card
 from models.hand import Hand
+from utils.evaluator import evaluate_seven, seven_card_strength
 
 
 def get_best_possible_hand(table_cards: List[Card], player_cards: Tuple[Card, Card]) -> Hand:
-    return max(Hand(list(hand)) for hand in combinations(tuple(table_cards) + player_cards, 5))
\ No newline at end of file
+    return max(Hand(list(hand)) for hand in combinations(tuple(table_cards) + player_cards, 5))
+
+
+def get_best_hand(table_cards: List[Card], player_cards: Tuple[Card, Card]) -> Tuple[int, List[Card]]:
+    cards = {card.encoded: card for card in tuple(table_cards) + player_cards}
+    strength, best_cards = evaluate_seven(list(cards))
+    return strength, [cards[encoded] for encoded in best_cards]
+
+
+def get_best_strength(table_cards: List[Card], player_cards: Tuple[Card, Card]) -> int:
+    return seven_card_strength([card.encoded for card in tuple(table_cards) + player_cards])
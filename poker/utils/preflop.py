@@ -0,0 +1,107 @@
+import mmap
+import os
+import struct
+from typing import List, Sequence, Tuple
+
+from models.card import Card
+
+
+# Binary layout, little endian:
+#   header      magic, version, hand classes, max opponents, samples per entry
+#   heads-up    uint16[169][169], equity of the row class against the column class
+#   multiway    uint16[169][max opponents], equity against 1..n random hands
+# Equities are stored as the share of the pot won, scaled to 0..65535.
+MAGIC = b"PFEQ"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHI")
+HAND_CLASSES = 169
+EQUITY_SCALE = 65535
+TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          "data", "preflop_equity.bin")
+
+RANK_CHARS = "23456789TJQKA"
+
+
+# Classes sit on the usual 13x13 grid: pairs on the diagonal, suited hands
+# with the higher rank as the row and offsuit hands with it as the column.
+def class_index(first_rank: int, second_rank: int, suited: bool) -> int:
+    high, low = max(first_rank, second_rank), min(first_rank, second_rank)
+    return high * 13 + low if suited or high == low else low * 13 + high
+
+
+def hand_class(cards: Sequence[Card]) -> int:
+    return class_index(cards[0].id % 13, cards[1].id % 13,
+                       cards[0].id // 13 == cards[1].id // 13)
+
+
+def class_name(index: int) -> str:
+    row, column = divmod(index, 13)
+    if row == column:
+        return RANK_CHARS[row] * 2
+    elif row > column:
+        return RANK_CHARS[row] + RANK_CHARS[column] + "s"
+    return RANK_CHARS[column] + RANK_CHARS[row] + "o"
+
+
+def class_combos(index: int) -> List[Tuple[int, int]]:
+    row, column = divmod(index, 13)
+    if row == column:
+        return [(s1 * 13 + row, s2 * 13 + row) for s1 in range(4) for s2 in range(s1 + 1, 4)]
+    elif row > column:
+        return [(suit * 13 + row, suit * 13 + column) for suit in range(4)]
+    return [(s1 * 13 + column, s2 * 13 + row)
+            for s1 in range(4) for s2 in range(4) if s1 != s2]
+
+
+class PreflopTable:
+    max_opponents: int
+    samples: int
+
+    def __init__(self, path: str = TABLE_PATH) -> None:
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, classes, self.max_opponents, self.samples = \
+            HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION or classes != HAND_CLASSES:
+            raise ValueError(f"{path} is not a version {VERSION} preflop equity table")
+
+        self.multiway_offset = HEADER.size + 2 * HAND_CLASSES * HAND_CLASSES
+
+    def _read(self, offset: int) -> float:
+        return struct.unpack_from("<H", self.data, offset)[0] / EQUITY_SCALE
+
+    def heads_up(self, index: int, other_index: int) -> float:
+        return self._read(HEADER.size + 2 * (index * HAND_CLASSES + other_index))
+
+    def multiway(self, index: int, opponents: int) -> float:
+        if not 1 <= opponents <= self.max_opponents:
+            raise ValueError(f"The table only covers 1 to {self.max_opponents} opponents")
+        return self._read(self.multiway_offset
+                          + 2 * (index * self.max_opponents + opponents - 1))
+
+
+_table: PreflopTable = None
+
+
+def get_table() -> PreflopTable:
+    global _table
+
+    if _table is None and os.path.exists(TABLE_PATH):
+        _table = PreflopTable()
+
+    return _table
+
+
+def preflop_equity(cards: Sequence[Card], opponents: int = 1) -> float:
+    table = get_table()
+    if table is None or opponents > table.max_opponents:
+        return None
+    return table.multiway(hand_class(cards), opponents)
+
+
+def preflop_matchup(cards: Sequence[Card], other_cards: Sequence[Card]) -> float:
+    table = get_table()
+    if table is None:
+        return None
+    return table.heads_up(hand_class(cards), hand_class(other_cards))
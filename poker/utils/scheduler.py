@@ -0,0 +1,68 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Callable, Dict, Hashable, List, Tuple
+
+
+class Scheduler:
+    # Deadlines for every table share one heap and one loop.call_later
+    # handle for the earliest of them, so nothing runs while nothing is due.
+    # Deadlines are wall-clock timestamps, which stay meaningful across a
+    # restart. Rescheduling or cancelling a key leaves its old heap entry
+    # behind; stale entries are skipped when they come up and compacted away
+    # once they outnumber the live ones.
+    heap: List[Tuple[float, int, Hashable]]
+    deadlines: Dict[Hashable, float]
+
+    def __init__(self, callback: Callable[[Hashable], None]) -> None:
+        self.callback = callback
+        self.heap = []
+        self.deadlines = {}
+        self.counter = itertools.count()
+        self.handle: asyncio.TimerHandle = None
+        self.armed_for: float = None
+
+    def __len__(self) -> int:
+        return len(self.deadlines)
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        if self.deadlines.get(key) == deadline:
+            return
+
+        self.deadlines[key] = deadline
+        heapq.heappush(self.heap, (deadline, next(self.counter), key))
+
+        if len(self.heap) > 2 * len(self.deadlines) + 64:
+            self.heap = [(deadline, next(self.counter), key)
+                         for key, deadline in self.deadlines.items()]
+            heapq.heapify(self.heap)
+        if self.armed_for is None or deadline < self.armed_for:
+            self.arm()
+
+    def cancel(self, key: Hashable) -> None:
+        self.deadlines.pop(key, None)
+
+    def arm(self) -> None:
+        while self.heap and self.deadlines.get(self.heap[0][2]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = self.armed_for = None
+        if self.heap:
+            self.armed_for = self.heap[0][0]
+            delay = max(self.armed_for - time.time(), 0)
+            self.handle = asyncio.get_event_loop().call_later(delay, self.fire)
+
+    def fire(self) -> None:
+        self.handle = self.armed_for = None
+        now = time.time()
+
+        while self.heap and self.heap[0][0] <= now:
+            deadline, _, key = heapq.heappop(self.heap)
+            if self.deadlines.get(key) == deadline:
+                del self.deadlines[key]
+                self.callback(key)
+
+        self.arm()
@@ -0,0 +1,110 @@
+import os
+import signal
+import subprocess
+import time
+from typing import Dict, List
+
+
+# Discord sends every event of a guild to shard (guild_id >> 22) % shards,
+# and direct messages to shard 0. Each worker process runs a fixed set of
+# shards, so a guild's tables always live in the same process.
+
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+    return (guild_id >> 22) % shard_count
+
+
+def shards_for_worker(worker: int, workers: int, shard_count: int) -> List[int]:
+    return list(range(worker, shard_count, workers))
+
+
+def worker_for_guild(guild_id: int, workers: int, shard_count: int) -> int:
+    return shard_for_guild(guild_id, shard_count) % workers
+
+
+class Supervisor:
+    # Starts one poker_bot process per worker and starts it again whenever
+    # it exits.
+    command: List[str]
+    workers: int
+    shard_count: int
+    processes: Dict[int, subprocess.Popen]
+
+    def __init__(self, command: List[str], workers: int, shard_count: int,
+                 restart_delay: float = 1.0, max_delay: float = 60.0) -> None:
+        self.command = command
+        self.workers = workers
+        self.shard_count = shard_count
+        self.restart_delay = restart_delay
+        self.max_delay = max_delay
+        self.processes = {}
+        self.started: Dict[int, float] = {}
+        self.delays: Dict[int, float] = {}
+        self.restart_at: Dict[int, float] = {}
+        self.restarts = 0
+        self.stopping = False
+
+    def environment(self, worker: int) -> Dict[str, str]:
+        env = dict(os.environ)
+        env["SHARD_COUNT"] = str(self.shard_count)
+        env["SHARD_IDS"] = ",".join(map(str, shards_for_worker(worker, self.workers,
+                                                                self.shard_count)))
+        env["WORKER_INDEX"] = str(worker)
+        # Each worker gets its share of the cores for !pkr-odds.
+        env.setdefault("ODDS_WORKERS", str(max((os.cpu_count() or 1) // self.workers, 1)))
+        return env
+
+    def spawn(self, worker: int) -> None:
+        env = self.environment(worker)
+        self.processes[worker] = subprocess.Popen(self.command, env=env)
+        self.started[worker] = time.monotonic()
+        print(f"Worker {worker} started with shards {env['SHARD_IDS']} "
+              f"(pid {self.processes[worker].pid})")
+
+    def poll(self) -> None:
+        now = time.monotonic()
+
+        for worker, process in list(self.processes.items()):
+            code = process.poll()
+            if code is None:
+                continue
+
+            # A worker that ran for a while is restarted right away, one that
+            # keeps dying waits twice as long each time.
+            if now - self.started[worker] > self.max_delay:
+                delay = self.restart_delay
+            else:
+                delay = min(self.delays.get(worker, self.restart_delay / 2) * 2, self.max_delay)
+            self.delays[worker] = delay
+            self.restart_at[worker] = now + delay
+            del self.processes[worker]
+            print(f"Worker {worker} exited with code {code}, restarting in {delay:.1f}s")
+
+        for worker, restart_at in list(self.restart_at.items()):
+            if restart_at <= now:
+                del self.restart_at[worker]
+                self.restarts += 1
+                self.spawn(worker)
+
+    def stop(self, *_) -> None:
+        self.stopping = True
+        for process in self.processes.values():
+            process.terminate()
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for worker in range(self.workers):
+            self.spawn(worker)
+
+        while not self.stopping:
+            self.poll()
+            time.sleep(0.5)
+
+        for process in self.processes.values():
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        return 0
+
@@ -0,0 +1,173 @@
+import random
+import time
+from collections import namedtuple
+from typing import Callable, Dict, List, Tuple
+
+from models.game import Game
+from models.player import Player
+from utils.game_constants import GameState
+from utils.preflop import preflop_equity
+
+
+# Headless driver for Game. Scripted strategies stand in for Discord users,
+# every action goes through the same checks as the poker_bot commands, and
+# the chip total is validated after each action.
+
+Action = Tuple  # ("check",), ("call",), ("raise", amount), ("fold",) or ("all_in",)
+Strategy = Callable[[Game, Player, random.Random], Action]
+SimulationResult = namedtuple("SimulationResult", ["Games", "Hands", "Actions", "Seconds",
+                                                   "Violations"])
+
+MAX_ACTIONS_PER_HAND = 1000
+
+
+class SimulatedUser:
+    id: int
+    name: str
+
+    def __init__(self, user_id: int, name: str = None) -> None:
+        self.id = user_id
+        self.name = name or f"Player {user_id}"
+
+
+def legal_actions(game: Game) -> List[str]:
+    player = game.current_player
+    actions = ["fold", "all_in"]
+
+    if player.current_bet == game.current_bet:
+        actions.append("check")
+    if player.max_bet > game.current_bet:
+        actions += ["call", "raise"]
+
+    return actions
+
+
+def passive(game: Game, player: Player, rng: random.Random) -> Action:
+    if "check" in legal_actions(game):
+        return ("check",)
+    return ("call",) if "call" in legal_actions(game) else ("all_in",)
+
+
+def random_player(game: Game, player: Player, rng: random.Random) -> Action:
+    action = rng.choice(legal_actions(game))
+    if action == "raise":
+        return ("raise", rng.randint(1, player.max_bet - game.current_bet))
+    return (action,)
+
+
+def aggressive(game: Game, player: Player, rng: random.Random) -> Action:
+    if "raise" in legal_actions(game) and rng.random() < 0.4:
+        most = player.max_bet - game.current_bet
+        return ("raise", max(1, min(most, game.options["Blind"] * rng.randint(2, 6))))
+    return passive(game, player, rng)
+
+
+def tight(game: Game, player: Player, rng: random.Random) -> Action:
+    opponents = max(len(game.pot.players_in_pot()) - 1, 1)
+    equity = preflop_equity(player.cards, opponents)
+
+    if equity is not None and equity < 1 / (opponents + 1) and \
+            "check" not in legal_actions(game):
+        return ("fold",)
+    return aggressive(game, player, rng) if equity and equity > 0.6 else passive(game, player, rng)
+
+
+STRATEGIES: Dict[str, Strategy] = {
+    "passive": passive,
+    "random": random_player,
+    "aggressive": aggressive,
+    "tight": tight,
+}
+
+
+class Simulator:
+    strategies: List[Strategy]
+    options: Dict[str, int]
+    rng: random.Random
+    violations: List[str]
+
+    def __init__(self, strategies: List[Strategy], options: Dict[str, int] = None,
+                 seed: int = None) -> None:
+        self.strategies = strategies
+        self.options = options or {}
+        self.rng = random.Random(seed)
+        self.violations = []
+        self.hands = 0
+        self.actions = 0
+
+    def new_game(self) -> Tuple[Game, Dict[Player, Strategy]]:
+        game = Game()
+        game.options.update(self.options)
+
+        for i in range(len(self.strategies)):
+            game.add_player(SimulatedUser(i))
+        game.start()
+
+        return game, {player: strategy
+                      for player, strategy in zip(game.players, self.strategies)}
+
+    def apply(self, game: Game, action: Action) -> List[str]:
+        name = action[0]
+
+        if name not in legal_actions(game):
+            raise ValueError(f"{game.current_player.name} tried an illegal {name}")
+        if name == "raise":
+            amount = action[1]
+            if amount < 1 or game.current_bet + amount > game.current_player.max_bet:
+                raise ValueError(f"{game.current_player.name} tried to raise by {amount}")
+            return game.raise_bet(amount)
+
+        return {
+            "check": game.check,
+            "call": game.call,
+            "fold": game.fold,
+            "all_in": game.all_in,
+        }[name]()
+
+    def check_chips(self, game: Game, total: int, in_hand: bool) -> None:
+        chips = sum(player.balance for player in game.players)
+        if in_hand:
+            chips += game.pot.value
+
+        if chips != total:
+            self.violations.append(f"hand {self.hands}: {chips} chips on the table, "
+                                   f"expected {total}")
+        for player in game.players:
+            if player.balance < 0:
+                self.violations.append(f"hand {self.hands}: {player.name} has a "
+                                       f"negative balance of {player.balance}")
+
+    def play_hand(self, game: Game, strategies: Dict[Player, Strategy]) -> None:
+        total = sum(player.balance for player in game.players)
+        # Seeded from the simulation, so a run can be repeated.
+        game.deal_hands(self.rng.getrandbits(128))
+        self.hands += 1
+        actions = 0
+
+        while game.state not in (GameState.NO_HANDS, GameState.NO_GAME):
+            self.check_chips(game, total, True)
+            player = game.current_player
+            self.apply(game, strategies[player](game, player, self.rng))
+            actions += 1
+
+            if actions > MAX_ACTIONS_PER_HAND:
+                self.violations.append(f"hand {self.hands}: betting did not finish "
+                                       f"after {actions} actions")
+                game.state = GameState.NO_GAME
+                break
+
+        self.actions += actions
+        self.check_chips(game, total, False)
+
+    def run(self, games: int, max_hands: int) -> SimulationResult:
+        started = time.perf_counter()
+
+        for _ in range(games):
+            game, strategies = self.new_game()
+            hands = 0
+            while game.state != GameState.NO_GAME and hands < max_hands:
+                self.play_hand(game, strategies)
+                hands += 1
+
+        return SimulationResult(games, self.hands, self.actions,
+                                time.perf_counter() - started, self.violations)
@@ -0,0 +1,92 @@
+import asyncio
+import time
+from typing import Dict
+
+
+class TableLock:
+    # Commands for one table run one at a time, in the order they arrived
+    # (asyncio.Lock wakes its waiters first in, first out). Tables don't
+    # share locks, so different tables still run concurrently.
+    lock: asyncio.Lock
+    depth: int
+    max_depth: int
+    last_depth: int
+    commands: int
+    last_wait: float
+    total_wait: float
+    longest_wait: float
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.depth = 0
+        self.max_depth = 0
+        self.last_depth = 0
+        self.commands = 0
+        self.last_wait = 0.0
+        self.total_wait = 0.0
+        self.longest_wait = 0.0
+
+    async def __aenter__(self) -> "TableLock":
+        # depth counts the command holding the lock and every one queued
+        # behind it.
+        self.depth += 1
+        self.last_depth = self.depth
+        self.max_depth = max(self.max_depth, self.depth)
+        started = time.perf_counter()
+
+        try:
+            await self.lock.acquire()
+        except BaseException:
+            self.depth -= 1
+            raise
+
+        self.last_wait = time.perf_counter() - started
+        self.commands += 1
+        self.total_wait += self.last_wait
+        self.longest_wait = max(self.longest_wait, self.last_wait)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.depth -= 1
+        self.lock.release()
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.commands if self.commands else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "commands": self.commands,
+            "last_wait": self.last_wait,
+            "mean_wait": self.mean_wait,
+            "longest_wait": self.longest_wait,
+        }
+
+
+class TableLocks:
+    locks: Dict[int, TableLock]
+
+    def __init__(self) -> None:
+        self.locks = {}
+
+    def __getitem__(self, channel_id: int) -> TableLock:
+        if channel_id not in self.locks:
+            self.locks[channel_id] = TableLock()
+        return self.locks[channel_id]
+
+    def waiting(self) -> int:
+        # Commands queued behind the ones holding their tables.
+        return sum(max(lock.depth - 1, 0) for lock in self.locks.values())
+
+    def deepest(self) -> int:
+        return max((lock.depth for lock in self.locks.values()), default=0)
+
+    def discard(self, channel_id: int) -> bool:
+        # Only an idle table's lock can go, since queued commands hold it.
+        lock = self.locks.get(channel_id)
+        if lock is not None and lock.depth > 0:
+            return False
+        self.locks.pop(channel_id, None)
+        return True
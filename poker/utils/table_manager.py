@@ -0,0 +1,118 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Callable, Dict
+
+from models.game import Game
+from models.snapshot import UserResolver, load_game
+from utils.action_log import ActionLog
+from utils.game_constants import GAME_OPTIONS, GameState
+from utils.game_store import GameStore, SnapshotWriter
+from utils.table_lock import TableLocks
+
+DEFAULT_OPTIONS = {key: value.Default for key, value in GAME_OPTIONS.items()}
+
+
+class TableManager:
+    # Keeps the tables that are in use in memory, least recently used first.
+    # Tables that sit idle past their TTL, or the oldest ones once there are
+    # more than max_tables, are handed to the snapshot writer and dropped,
+    # together with the Discord users they hold. They are loaded again from
+    # the store the next time a command arrives for their channel.
+    tables: "OrderedDict[int, Game]"
+    used: Dict[int, float]
+    max_tables: int
+    idle_ttl: float
+    finished_ttl: float
+
+    def __init__(self, store: GameStore, writer: SnapshotWriter, action_log: ActionLog,
+                 locks: TableLocks, resolve_user: UserResolver, max_tables: int = 1000,
+                 idle_ttl: float = 1800, finished_ttl: float = 300,
+                 on_evict: Callable[[int], None] = None) -> None:
+        self.store = store
+        self.writer = writer
+        self.action_log = action_log
+        self.locks = locks
+        self.resolve_user = resolve_user
+        self.max_tables = max_tables
+        self.idle_ttl = idle_ttl
+        self.finished_ttl = finished_ttl
+        self.on_evict = on_evict
+        self.tables = OrderedDict()
+        self.used = {}
+        self.evictions = 0
+        self.task: asyncio.Task = None
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    def __contains__(self, channel_id: int) -> bool:
+        return channel_id in self.tables
+
+    async def get(self, channel_id: int) -> Game:
+        if channel_id in self.tables:
+            self.tables.move_to_end(channel_id)
+        else:
+            # A table evicted moments ago may still be waiting to be written.
+            game = self.writer.dirty.get(channel_id)
+            if channel_id in self.writer.deleted:
+                # Its rows and log are on their way out, so it starts afresh.
+                game = Game()
+                self.action_log.attach(channel_id, game)
+            elif game is None:
+                snapshot = await self.store.load_async(channel_id)
+                game = load_game(snapshot, self.resolve_user) if snapshot else Game()
+                game = self.action_log.recover(channel_id, game)
+
+            if channel_id not in self.tables:
+                self.tables[channel_id] = game
+                self.trim()
+
+        self.used[channel_id] = time.monotonic()
+        return self.tables[channel_id]
+
+    def evict(self, channel_id: int) -> bool:
+        if not self.locks.discard(channel_id):
+            return False
+
+        game = self.tables.pop(channel_id)
+        del self.used[channel_id]
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(channel_id)
+
+        # Nothing worth keeping at a table where no game was ever started.
+        if not game.players and not game.log_seq:
+            return True
+
+        # A table whose game is over, with the default options, is no
+        # different from that, so its rows and log are dropped.
+        if game.state == GameState.NO_GAME and game.options == DEFAULT_OPTIONS:
+            self.writer.delete(channel_id)
+            self.action_log.delete(channel_id)
+        else:
+            self.writer.mark_dirty(channel_id, game)
+        return True
+
+    def trim(self) -> None:
+        for channel_id in list(self.tables):
+            if len(self.tables) <= self.max_tables:
+                break
+            self.evict(channel_id)
+
+    def sweep(self) -> None:
+        now = time.monotonic()
+
+        for channel_id, game in list(self.tables.items()):
+            ttl = self.finished_ttl if game.state == GameState.NO_GAME else self.idle_ttl
+            if now - self.used[channel_id] > ttl:
+                self.evict(channel_id)
+
+    def start(self, interval: float = 60) -> None:
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run(interval))
+
+    async def run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep()
@@ -0,0 +1,184 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set
+
+import discord
+
+from models.game import Game
+from utils.game_constants import HAND_STATES, GameState
+
+
+VIEW_LINES = 12
+EMBED_LIMIT = 4096
+
+
+def render_table(game: Game) -> List[str]:
+    if game.state == GameState.NO_GAME:
+        return ["No game is running. Message !pkr-newgame to start one."]
+    if game.state == GameState.WAITING:
+        return ["Waiting for players: " + ", ".join(player.name for player in game.players)]
+
+    in_hand = game.state in HAND_STATES
+    lines = []
+
+    if in_hand:
+        board = "  ".join(str(card) for card in game.table_cards) or "no cards yet"
+        lines.append(f"**Board:** {board}")
+        lines.append(f"**Pot:** ${game.pot.value}, current bet ${game.current_bet}")
+
+    for player in game.players:
+        line = f"{player.name}: ${player.balance}"
+        if player is game.dealer:
+            line += " (dealer)"
+        if in_hand:
+            if player not in game.pot.players_in_pot():
+                line += ", folded"
+            elif player.balance == 0:
+                line += ", all in"
+            elif player.current_bet:
+                line += f", bet ${player.current_bet}"
+            if player in game.players_in_hand and player is game.current_player:
+                line = f"**▶ {line}**"
+        lines.append(line)
+
+    if not in_hand:
+        lines.append(f"Waiting for {game.dealer.name} to !pkr-deal.")
+
+    return lines
+
+
+class TableView:
+    # One message per table that shows its state, edited in place instead
+    # of sending a new embed for every command. Updates that arrive while an
+    # edit is pending or too soon after the last one are folded into a
+    # single edit, at most one every interval seconds. The message is pinned
+    # while a game runs, and unpinned when the game ends or the view is
+    # discarded, since a channel only holds 50 pins.
+    channel: discord.abc.Messageable
+    game: Game
+    message: discord.Message
+    lines: Deque[str]
+    interval: float
+
+    def __init__(self, channel: discord.abc.Messageable, game: Game,
+                 interval: float = 1.5) -> None:
+        self.channel = channel
+        self.game = game
+        self.message = None
+        self.lines = deque(maxlen=VIEW_LINES)
+        self.interval = interval
+        self.last_edit = 0.0
+        self.task: asyncio.Task = None
+        # None until a pin has been tried for the current message.
+        self.pinned: Optional[bool] = None
+        self.closed = False
+        self.updates = 0
+        self.edits = 0
+
+    def update(self, game: Game, messages: List[str]) -> None:
+        self.game = game
+        self.lines.extend(messages)
+        self.updates += 1
+
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.flush())
+
+    def render(self) -> discord.Embed:
+        table = "\n".join(render_table(self.game))
+        log = "\n".join(self.lines)
+        # The oldest log lines give way first if the embed gets too long.
+        log = log[max(len(log) - (EMBED_LIMIT - len(table) - 2), 0):]
+        return discord.Embed(description=f"{table}\n\n{log}"[:EMBED_LIMIT], color=0x00ff00)
+
+    async def flush(self) -> None:
+        delay = self.last_edit + self.interval - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        # Updates from here on need another edit, since this one may already
+        # be on its way.
+        self.task = None
+        embed = self.render()
+        self.last_edit = time.monotonic()
+
+        try:
+            edited = False
+            if self.message is not None:
+                try:
+                    await self.message.edit(embed=embed)
+                    edited = True
+                except discord.NotFound:
+                    # Deleted by someone, so the view starts over below.
+                    self.message = None
+
+            if not edited:
+                self.message = await self.channel.send(embed=embed)
+                self.pinned = None
+            self.edits += 1
+
+            running = not self.closed and self.game.state != GameState.NO_GAME
+            if running and self.pinned is None:
+                try:
+                    await self.message.pin()
+                    self.pinned = True
+                except discord.HTTPException:
+                    self.pinned = False
+            elif not running and self.pinned:
+                await self.unpin()
+        except discord.HTTPException as error:
+            print(f"Failed to update the table view: {error}")
+
+    async def unpin(self) -> None:
+        message, self.message = self.message, None
+        if self.pinned:
+            self.pinned = None
+            try:
+                await message.unpin()
+            except discord.HTTPException as error:
+                print(f"Failed to unpin the table view: {error}")
+
+    def close(self) -> None:
+        # A pending edit is dropped, and one already on its way unpins the
+        # message once it is done.
+        self.closed = True
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+
+class TableViews:
+    views: Dict[int, TableView]
+    tasks: Set[asyncio.Task]
+
+    def __init__(self, interval: float = 1.5) -> None:
+        self.views = {}
+        self.interval = interval
+        self.tasks = set()
+        # Of the views discarded so far.
+        self.past_updates = 0
+        self.past_edits = 0
+
+    def update(self, channel: discord.abc.Messageable, game: Game,
+               messages: List[str]) -> None:
+        if channel.id not in self.views:
+            self.views[channel.id] = TableView(channel, game, self.interval)
+        self.views[channel.id].update(game, messages)
+
+    def discard(self, channel_id: int) -> None:
+        view = self.views.pop(channel_id, None)
+        if view is None:
+            return
+
+        self.past_updates += view.updates
+        self.past_edits += view.edits
+        view.close()
+        task = asyncio.ensure_future(view.unpin())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def updates(self) -> int:
+        return self.past_updates + sum(view.updates for view in self.views.values())
+
+    def edits(self) -> int:
+        return self.past_edits + sum(view.edits for view in self.views.values())
@@ -3,18 +3,23 @@ import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 
+import metrics
+
 
 load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 RADIO_URL = os.getenv("RADIO_URL")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
 intents = discord.Intents.default()
 intents.members = True
 
 client = commands.Bot(command_prefix='!r', intents=intents)
+metrics.instrument_commands(client)
 
 
 @client.event
 async def on_ready():
+    await metrics.start(client, METRICS_PORT)
     print("Radio bot ready!")
 
 
@@ -0,0 +1,57 @@
+import asyncio
+from typing import Dict, List, Set
+
+import discord
+
+# Copied into the eco bot; edit this one and run check_shared.py --sync.
+
+
+class Announcer:
+    # Lines announced in a channel are held for interval seconds after the
+    # first one and then sent together, so a channel gets at most one
+    # message per interval however busy it is.
+    interval: float
+    max_lines: int
+    pending: Dict[int, List[str]]
+    tasks: Set[asyncio.Task]
+
+    def __init__(self, interval: float, max_lines: int = 20, delete_after: float = None) -> None:
+        self.interval = interval
+        self.max_lines = max_lines
+        self.delete_after = delete_after
+        self.pending = {}
+        self.tasks = set()
+        self.sent = 0
+
+    def announce(self, channel: discord.abc.Messageable, line: str) -> None:
+        lines = self.pending.get(channel.id)
+        if lines is None:
+            lines = self.pending[channel.id] = []
+            asyncio.get_event_loop().call_later(self.interval, self.start_send, channel)
+        lines.append(line)
+
+    def start_send(self, channel: discord.abc.Messageable) -> None:
+        # Held until done, so an error is printed instead of lost.
+        task = asyncio.ensure_future(self.send(channel))
+        self.tasks.add(task)
+        task.add_done_callback(self.sent_done)
+
+    def sent_done(self, task: asyncio.Task) -> None:
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Failed to announce: {task.exception()!r}")
+
+    async def send(self, channel: discord.abc.Messageable) -> None:
+        lines = self.pending.pop(channel.id, [])
+        if len(lines) > self.max_lines:
+            lines = lines[:self.max_lines] + [f"...and {len(lines) - self.max_lines} more"]
+
+        embed = discord.Embed(
+            description="\n".join(lines),
+            color=0x00ff00
+        )
+        try:
+            await channel.send(embed=embed, delete_after=self.delete_after)
+            self.sent += 1
+        except discord.HTTPException as error:
+            print(f"Failed to announce in {channel.id}: {error}")
@@ -0,0 +1,149 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+# Users are kept in XP order in buckets of LOAD to 2 * LOAD entries, each
+# two arrays of negated XP and user id sorted together, so a user costs
+# 16 bytes. A Fenwick tree over the bucket sizes turns a bucket index into
+# the number of users ahead of it and back.
+LOAD = 512
+
+
+class Fenwick:
+    tree: List[int]
+
+    def __init__(self, sizes: List[int]) -> None:
+        self.tree = [0] + sizes
+        for index in range(1, len(self.tree)):
+            parent = index + (index & -index)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[index]
+
+    def add(self, index: int, amount: int) -> None:
+        index += 1
+        while index < len(self.tree):
+            self.tree[index] += amount
+            index += index & -index
+
+    def prefix(self, index: int) -> int:
+        # Sum of the sizes before index.
+        total = 0
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def search(self, position: int) -> Tuple[int, int]:
+        # The bucket holding position, and the offset of position in it.
+        index = 0
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while step:
+            if index + step < len(self.tree) and self.tree[index + step] <= position:
+                index += step
+                position -= self.tree[index]
+            step >>= 1
+        return index, position
+
+
+def position(xps: array, ids: array, negated_xp: int, user_id: int) -> int:
+    # Ties on XP are ordered by user id.
+    low = bisect_left(xps, negated_xp)
+    high = bisect_right(xps, negated_xp, low)
+    return bisect_left(ids, user_id, low, high)
+
+
+class Leaderboard:
+    xps: List[array]
+    ids: List[array]
+    maxes: List[Tuple[int, int]]
+    fenwick: Fenwick
+
+    def __init__(self, totals: Dict[int, int] = None) -> None:
+        self.rebuild(totals or {})
+
+    def rebuild(self, totals: Dict[int, int]) -> None:
+        entries = sorted((-xp, user_id) for user_id, xp in totals.items())
+        self.xps = []
+        self.ids = []
+        for start in range(0, len(entries), LOAD):
+            chunk = entries[start:start + LOAD]
+            self.xps.append(array("q", [negated_xp for negated_xp, _ in chunk]))
+            self.ids.append(array("Q", [user_id for _, user_id in chunk]))
+        self.reindex()
+
+    def reindex(self) -> None:
+        # After buckets are added or removed, which happens once every LOAD
+        # changes at most.
+        self.maxes = [(xps[-1], ids[-1]) for xps, ids in zip(self.xps, self.ids)]
+        self.fenwick = Fenwick([len(xps) for xps in self.xps])
+
+    def __len__(self) -> int:
+        return self.fenwick.prefix(len(self.xps))
+
+    def bucket(self, negated_xp: int, user_id: int) -> int:
+        return min(bisect_left(self.maxes, (negated_xp, user_id)), len(self.maxes) - 1)
+
+    def insert(self, user_id: int, xp: int) -> None:
+        if not self.xps:
+            self.xps.append(array("q", [-xp]))
+            self.ids.append(array("Q", [user_id]))
+            self.reindex()
+            return
+
+        index = self.bucket(-xp, user_id)
+        xps, ids = self.xps[index], self.ids[index]
+        at = position(xps, ids, -xp, user_id)
+        xps.insert(at, -xp)
+        ids.insert(at, user_id)
+
+        if len(xps) > 2 * LOAD:
+            self.xps[index:index + 1] = [xps[:LOAD], xps[LOAD:]]
+            self.ids[index:index + 1] = [ids[:LOAD], ids[LOAD:]]
+            self.reindex()
+        else:
+            self.maxes[index] = (xps[-1], ids[-1])
+            self.fenwick.add(index, 1)
+
+    def remove(self, user_id: int, xp: int) -> None:
+        index = self.bucket(-xp, user_id)
+        xps, ids = self.xps[index], self.ids[index]
+        at = position(xps, ids, -xp, user_id)
+        if at == len(ids) or ids[at] != user_id or xps[at] != -xp:
+            raise KeyError(user_id)
+        del xps[at]
+        del ids[at]
+
+        if not xps:
+            del self.xps[index]
+            del self.ids[index]
+            self.reindex()
+        else:
+            self.maxes[index] = (xps[-1], ids[-1])
+            self.fenwick.add(index, -1)
+
+    def update(self, user_id: int, old_xp: Optional[int], new_xp: int) -> None:
+        if old_xp is not None:
+            self.remove(user_id, old_xp)
+        self.insert(user_id, new_xp)
+
+    def rank(self, user_id: int, xp: int) -> Optional[int]:
+        # 1 for the user with the most XP.
+        if not self.xps:
+            return None
+        index = self.bucket(-xp, user_id)
+        xps, ids = self.xps[index], self.ids[index]
+        at = position(xps, ids, -xp, user_id)
+        if at == len(ids) or ids[at] != user_id:
+            return None
+        return self.fenwick.prefix(index) + at + 1
+
+    def page(self, start: int, count: int) -> List[Tuple[int, int]]:
+        # (user_id, xp) of the users ranked start + 1 to start + count.
+        index, at = self.fenwick.search(start)
+        entries: List[Tuple[int, int]] = []
+        while index < len(self.xps) and len(entries) < count:
+            xps, ids = self.xps[index], self.ids[index]
+            end = min(len(ids), at + count - len(entries))
+            entries.extend((ids[i], -xps[i]) for i in range(at, end))
+            index, at = index + 1, 0
+        return entries
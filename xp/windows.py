@@ -0,0 +1,138 @@
+import time
+from array import array
+from typing import Dict, List, Set, Tuple
+
+from leaderboard import Leaderboard
+
+# XP earned in the last 24 hours, the last 7 days and the last 30 days,
+# counting today. Each user with XP in the last 30 days has one array of
+# 24 hour slots, 30 day slots and the hour of their last award. A slot is
+# reused once its hour or day has left every window, so the array never
+# grows.
+HOURS = 24
+DAYS = 30
+WEEK = 7
+LAST_HOUR = HOURS + DAYS
+WINDOWS = ("daily", "weekly", "monthly")
+
+
+def current_hour(now: float = None) -> int:
+    return int((time.time() if now is None else now) // 3600)
+
+
+class WindowedXP:
+    # One per guild. The window totals are kept up to date as XP is awarded.
+    # Expired slots are only subtracted when the clock is next read. The
+    # users who earned XP in each hour and day are remembered, so expiring a
+    # slot only touches the users who have something in it.
+    hour: int
+    rings: Dict[int, array]
+    totals: Dict[str, Dict[int, int]]
+    leaderboards: Dict[str, Leaderboard]
+    hour_users: List[Set[int]]
+    day_users: List[Set[int]]
+
+    def __init__(self, rings: Dict[int, array] = None, now: float = None) -> None:
+        self.hour = current_hour(now)
+        self.rings = {}
+        self.totals = {window: {} for window in WINDOWS}
+        self.hour_users = [set() for _ in range(HOURS)]
+        self.day_users = [set() for _ in range(DAYS)]
+
+        for user_id, ring in (rings or {}).items():
+            self.restore(user_id, ring)
+        self.leaderboards = {window: Leaderboard(self.totals[window]) for window in WINDOWS}
+
+    def restore(self, user_id: int, ring: array) -> None:
+        # Slots are matched to the latest hour and day they can stand for,
+        # given the user's last award, and dropped if that has expired.
+        last = ring[LAST_HOUR]
+        day, last_day = self.hour // HOURS, last // HOURS
+
+        for slot in range(HOURS):
+            hour = last - (last - slot) % HOURS
+            if ring[slot] and hour > self.hour - HOURS:
+                self.hour_users[slot].add(user_id)
+                self.add("daily", user_id, ring[slot])
+            else:
+                ring[slot] = 0
+
+        for slot in range(DAYS):
+            ring_day = last_day - (last_day - slot) % DAYS
+            if ring[HOURS + slot] and ring_day > day - DAYS:
+                self.day_users[slot].add(user_id)
+                self.add("monthly", user_id, ring[HOURS + slot])
+                if ring_day > day - WEEK:
+                    self.add("weekly", user_id, ring[HOURS + slot])
+            else:
+                ring[HOURS + slot] = 0
+
+        if user_id in self.totals["monthly"]:
+            self.rings[user_id] = ring
+
+    def add(self, window: str, user_id: int, xp: int) -> None:
+        totals = self.totals[window]
+        totals[user_id] = totals.get(user_id, 0) + xp
+
+    def change(self, window: str, user_id: int, xp: int) -> None:
+        totals = self.totals[window]
+        old = totals.get(user_id)
+        new = (old or 0) + xp
+        if new:
+            totals[user_id] = new
+            self.leaderboards[window].update(user_id, old, new)
+        else:
+            del totals[user_id]
+            self.leaderboards[window].remove(user_id, old)
+
+    def advance(self, hour: int) -> None:
+        old_hour, old_day, day = self.hour, self.hour // HOURS, hour // HOURS
+        if hour <= old_hour:
+            return
+        self.hour = hour
+
+        # Hours and days leave the windows oldest first, and at most a whole
+        # window of them, however long the clock was not read.
+        for leaving in range(old_hour - HOURS + 1, min(hour - HOURS, old_hour) + 1):
+            slot = leaving % HOURS
+            for user_id in self.hour_users[slot]:
+                self.change("daily", user_id, -self.rings[user_id][slot])
+                self.rings[user_id][slot] = 0
+            self.hour_users[slot] = set()
+
+        for leaving in range(old_day - WEEK + 1, min(day - WEEK, old_day) + 1):
+            slot = leaving % DAYS
+            for user_id in self.day_users[slot]:
+                self.change("weekly", user_id, -self.rings[user_id][HOURS + slot])
+
+        for leaving in range(old_day - DAYS + 1, min(day - DAYS, old_day) + 1):
+            slot = leaving % DAYS
+            for user_id in self.day_users[slot]:
+                self.change("monthly", user_id, -self.rings[user_id][HOURS + slot])
+                self.rings[user_id][HOURS + slot] = 0
+                if user_id not in self.totals["monthly"]:
+                    del self.rings[user_id]
+            self.day_users[slot] = set()
+
+    def award(self, user_id: int, xp: int, now: float = None) -> None:
+        hour = current_hour(now)
+        self.advance(hour)
+        # An award stamped before the clock, e.g. from a slow message, counts
+        # for the current hour.
+        hour = self.hour
+
+        ring = self.rings.get(user_id)
+        if ring is None:
+            ring = self.rings[user_id] = array("I", bytes(4 * (LAST_HOUR + 1)))
+        ring[hour % HOURS] += xp
+        ring[HOURS + hour // HOURS % DAYS] += xp
+        ring[LAST_HOUR] = hour
+        self.hour_users[hour % HOURS].add(user_id)
+        self.day_users[hour // HOURS % DAYS].add(user_id)
+
+        for window in WINDOWS:
+            self.change(window, user_id, xp)
+
+    def leaderboard(self, window: str, now: float = None) -> Tuple[Dict[int, int], Leaderboard]:
+        self.advance(current_hour(now))
+        return self.totals[window], self.leaderboards[window]
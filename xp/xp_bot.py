@@ -3,27 +3,134 @@ import discord
 import random
 from dotenv import load_dotenv
 
+import metrics
+from announcer import Announcer
+from rate_limit import RateLimiter
+from windows import WINDOWS
+from xp_store import XPCache, XPStore, level_for
+
 
 load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+XP_DB = os.getenv("XP_DB", "xp.db")
+# XP is written to the database every FLUSH_INTERVAL seconds, or sooner
+# once FLUSH_UPDATES awards are waiting.
+FLUSH_INTERVAL = float(os.getenv("FLUSH_INTERVAL", 5))
+FLUSH_UPDATES = int(os.getenv("FLUSH_UPDATES", 5000))
+# Each user gets AWARD_BURST awards in a row, then one every AWARD_INTERVAL
+# seconds. Other messages are ignored.
+AWARD_INTERVAL = float(os.getenv("AWARD_INTERVAL", 60))
+AWARD_BURST = int(os.getenv("AWARD_BURST", 1))
+# Each user gets COMMAND_BURST answers to !rank and !top in a row, then one
+# every COMMAND_INTERVAL seconds.
+COMMAND_INTERVAL = float(os.getenv("COMMAND_INTERVAL", 10))
+COMMAND_BURST = int(os.getenv("COMMAND_BURST", 3))
+# With AGGREGATE on, awards are kept quietly and only level-ups are
+# announced, at most once per channel every ANNOUNCE_INTERVAL seconds.
+# AGGREGATE=0 answers every award. Messages are only deleted with
+# DELETE_MESSAGES=1.
+AGGREGATE = bool(int(os.getenv("AGGREGATE", 1)))
+ANNOUNCE_INTERVAL = float(os.getenv("ANNOUNCE_INTERVAL", 30))
+DELETE_MESSAGES = bool(int(os.getenv("DELETE_MESSAGES", 0)))
+DEFAULT_TOP = 10
+MAX_TOP = 25
 
 client = discord.Client()
+xp_cache = XPCache(XPStore(XP_DB), FLUSH_INTERVAL, FLUSH_UPDATES)
+rate_limiter = RateLimiter(AWARD_INTERVAL, AWARD_BURST)
+# Commands have their own buckets, so they don't use up a user's awards.
+command_limiter = RateLimiter(COMMAND_INTERVAL, COMMAND_BURST)
+announcer = Announcer(ANNOUNCE_INTERVAL)
+rate_limited = metrics.REGISTRY.counter("bot_rate_limited_total",
+                                        "Messages ignored by the rate limiter").labels()
+metrics.REGISTRY.gauge_function("bot_announcements_sent",
+                                "Announcement messages sent since the start",
+                                lambda: announcer.sent)
 
 @client.event
 async def on_ready():
+    await metrics.start(client, METRICS_PORT)
+    xp_cache.start()
     print("XP bot ready!")
 
 @client.event
+@metrics.timed(metrics.EVENT_SECONDS.labels("message"))
 async def on_message(message):
     channel = message.channel
 
-    if message.author != client.user:
-        embed = discord.Embed(
-            description=str(get_xp()),
-            color=0x00ff00
-        )
+    # XP is kept per guild, so direct messages don't earn any.
+    if message.author == client.user or message.guild is None:
+        return
+
+    words = message.content.split()
+    command = words[0] if words else None
+    delete_after = 60
+
+    if command in ("!rank", "!top"):
+        if not command_limiter.allow(message.guild.id, message.author.id):
+            rate_limited.inc()
+            return
+        show = show_rank if command == "!rank" else show_top
+        description = await show(message, words[1:])
+    elif not rate_limiter.allow(message.guild.id, message.author.id):
+        rate_limited.inc()
+        return
+    else:
+        xp = get_xp()
+        total, levels = await xp_cache.award(message.guild.id, message.author.id, xp)
+        if AGGREGATE:
+            if levels:
+                announcer.announce(channel, f"{message.author.mention} reached level "
+                                            f"{level_for(total)}!")
+            return
+
+        description = f"+{xp} XP ({total} total)"
+        if levels:
+            description += f"\n{message.author.display_name} reached level {level_for(total)}!"
+        delete_after = 20
+
+    embed = discord.Embed(
+        description=description,
+        color=0x00ff00
+    )
+    if DELETE_MESSAGES:
         await message.delete()
-        await channel.send(embed=embed, delete_after=20)
+    await channel.send(embed=embed, delete_after=delete_after)
+
+async def leaderboard_for(message, args):
+    # The all-time leaderboard, or the one named by the first argument.
+    if args and args[0] in WINDOWS:
+        windows = await xp_cache.window(message.guild.id)
+        return (args[0],) + windows.leaderboard(args[0]), args[1:]
+    totals = await xp_cache.guild(message.guild.id)
+    return ("all-time", totals, xp_cache.leaderboards[message.guild.id]), args
+
+async def show_rank(message, args) -> str:
+    # !rank [daily|weekly|monthly] [@user]
+    (window, totals, leaderboard), args = await leaderboard_for(message, args)
+    member = message.mentions[0] if message.mentions else message.author
+
+    xp = totals.get(member.id)
+    if xp is None:
+        return f"{member.display_name} has no {window} XP yet."
+    rank = leaderboard.rank(member.id, xp)
+    description = f"{member.display_name} is #{rank} of {len(leaderboard)} with {xp} {window} XP"
+    return description + (f" (level {level_for(xp)})." if window == "all-time" else ".")
+
+async def show_top(message, args) -> str:
+    # !top [daily|weekly|monthly] [count] [page]
+    (window, totals, leaderboard), args = await leaderboard_for(message, args)
+    count = int(args[0]) if args and args[0].isdigit() else DEFAULT_TOP
+    count = min(max(count, 1), MAX_TOP)
+    page = int(args[1]) if len(args) > 1 and args[1].isdigit() else 1
+    start = (max(page, 1) - 1) * count
+
+    entries = leaderboard.page(start, count)
+    if not entries:
+        return f"Nobody has earned {window} XP yet." if start == 0 else f"There is no page {page}."
+    return f"Top {window} XP\n" + "\n".join(f"#{start + i + 1} <@{user_id}> {xp} XP"
+                                             for i, (user_id, xp) in enumerate(entries))
 
 def get_multiplier() -> int:
     multiplier = 1
@@ -41,4 +148,5 @@ def get_multiplier() -> int:
 def get_xp() -> int:
     return get_multiplier() * random.randrange(1, 30, 1)
 
-client.run(DISCORD_TOKEN)
\ No newline at end of file
+client.run(DISCORD_TOKEN)
+xp_cache.close()
\ No newline at end of file
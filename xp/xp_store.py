@@ -0,0 +1,218 @@
+import asyncio
+import sqlite3
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Set, Tuple
+
+from leaderboard import Leaderboard
+from windows import DAYS, HOURS, LAST_HOUR, WindowedXP, current_hour
+
+MAX_LEVEL = 1000
+
+
+def level_thresholds(max_level: int = MAX_LEVEL) -> List[int]:
+    # Total XP needed for each level; level l takes 5l² + 50l + 100 more
+    # than the one before.
+    thresholds = [0]
+    for level in range(max_level):
+        thresholds.append(thresholds[-1] + 5 * level * level + 50 * level + 100)
+    return thresholds
+
+
+LEVEL_THRESHOLDS = level_thresholds()
+
+
+def level_for(xp: int) -> int:
+    return bisect_right(LEVEL_THRESHOLDS, xp) - 1
+
+
+class XPStore:
+    # All access goes through one worker thread, which owns the connection.
+    path: str
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="xp-store")
+        self.connection: sqlite3.Connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS xp ("
+                                    "guild_id INTEGER NOT NULL, "
+                                    "user_id INTEGER NOT NULL, "
+                                    "xp INTEGER NOT NULL, "
+                                    "PRIMARY KEY (guild_id, user_id)) WITHOUT ROWID")
+            # The time slots of each user's recent XP, and the hour of
+            # their last award.
+            self.connection.execute("CREATE TABLE IF NOT EXISTS recent_xp ("
+                                    "guild_id INTEGER NOT NULL, "
+                                    "user_id INTEGER NOT NULL, "
+                                    "hour INTEGER NOT NULL, "
+                                    "slots BLOB NOT NULL, "
+                                    "PRIMARY KEY (guild_id, user_id)) WITHOUT ROWID")
+        return self.connection
+
+    def load_guild(self, guild_id: int) -> List[Tuple[int, int]]:
+        return self._connect().execute("SELECT user_id, xp FROM xp WHERE guild_id = ?",
+                                       (guild_id,)).fetchall()
+
+    def load_recent(self, guild_id: int, hour: int) -> List[Tuple[int, bytes]]:
+        # Users with nothing left in any window are dropped on the way.
+        with self._connect() as connection:
+            connection.execute("DELETE FROM recent_xp WHERE guild_id = ? AND hour <= ?",
+                               (guild_id, hour - DAYS * HOURS))
+        return self._connect().execute("SELECT user_id, slots FROM recent_xp "
+                                       "WHERE guild_id = ?", (guild_id,)).fetchall()
+
+    def save_many(self, totals: Iterable[Tuple[int, int, int]],
+                  recent: Iterable[Tuple[int, int, int, bytes]] = ()) -> None:
+        with self._connect() as connection:
+            connection.executemany("INSERT OR REPLACE INTO xp VALUES (?, ?, ?)", totals)
+            connection.executemany("INSERT OR REPLACE INTO recent_xp VALUES (?, ?, ?, ?)",
+                                   recent)
+
+    async def load_guild_async(self, guild_id: int) -> List[Tuple[int, int]]:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, self.load_guild, guild_id)
+
+    async def load_recent_async(self, guild_id: int, hour: int) -> List[Tuple[int, bytes]]:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, self.load_recent, guild_id, hour)
+
+
+class XPCache:
+    # Totals are read and changed in memory. The users awarded XP since the
+    # last flush have their totals written in one transaction on the store's
+    # thread, every interval or as soon as max_updates awards have piled up,
+    # so a crash loses at most one interval.
+    store: XPStore
+    guilds: Dict[int, Dict[int, int]]
+    leaderboards: Dict[int, Leaderboard]
+    windows: Dict[int, WindowedXP]
+    pending: Set[Tuple[int, int]]
+
+    def __init__(self, store: XPStore, interval: float = 5.0, max_updates: int = 5000) -> None:
+        self.store = store
+        self.interval = interval
+        self.max_updates = max_updates
+        self.guilds = {}
+        self.leaderboards = {}
+        self.windows = {}
+        self.loading: Dict[int, asyncio.Future] = {}
+        self.pending = set()
+        # The users of the write running on the store's thread, if any.
+        self.writing: Set[Tuple[int, int]] = set()
+        self.updates = 0
+        self.flushing: asyncio.Future = None
+        self.task: asyncio.Task = None
+
+    async def guild(self, guild_id: int) -> Dict[int, int]:
+        totals = self.guilds.get(guild_id)
+        if totals is not None:
+            return totals
+
+        # Messages arriving while a guild loads wait for the same query.
+        if guild_id not in self.loading:
+            self.loading[guild_id] = asyncio.ensure_future(self.load(guild_id))
+        try:
+            totals, leaderboard, windows = await asyncio.shield(self.loading[guild_id])
+        finally:
+            self.loading.pop(guild_id, None)
+
+        if guild_id not in self.guilds:
+            self.guilds[guild_id] = totals
+            self.leaderboards[guild_id] = leaderboard
+            self.windows[guild_id] = windows
+        return self.guilds[guild_id]
+
+    async def load(self, guild_id: int) -> Tuple[Dict[int, int], Leaderboard, WindowedXP]:
+        # The leaderboards of a large guild take a while to sort, so they
+        # are built on the store's thread too.
+        totals = dict(await self.store.load_guild_async(guild_id))
+        rings = {user_id: array("I", slots) for user_id, slots
+                 in await self.store.load_recent_async(guild_id, current_hour())}
+        loop = asyncio.get_event_loop()
+        leaderboard = await loop.run_in_executor(self.store.executor, Leaderboard, totals)
+        windows = await loop.run_in_executor(self.store.executor, WindowedXP, rings)
+        return totals, leaderboard, windows
+
+    async def window(self, guild_id: int) -> WindowedXP:
+        await self.guild(guild_id)
+        return self.windows[guild_id]
+
+    async def leaderboard(self, guild_id: int) -> Leaderboard:
+        await self.guild(guild_id)
+        return self.leaderboards[guild_id]
+
+    async def award(self, guild_id: int, user_id: int, xp: int) -> Tuple[int, int]:
+        # Returns the user's new total and how many levels it went up.
+        totals = await self.guild(guild_id)
+        old = totals.get(user_id)
+        totals[user_id] = (old or 0) + xp
+        self.leaderboards[guild_id].update(user_id, old, totals[user_id])
+        self.windows[guild_id].award(user_id, xp)
+
+        self.pending.add((guild_id, user_id))
+        self.updates += 1
+        if self.updates >= self.max_updates and self.flushing is None:
+            self.flushing = asyncio.ensure_future(self.flush())
+
+        return totals[user_id], level_for(totals[user_id]) - level_for(old or 0)
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self.pending:
+            self.flushing = None
+            return
+
+        pending, self.pending = self.pending, set()
+        self.writing = pending
+        self.updates = 0
+
+        loop = asyncio.get_event_loop()
+        try:
+            await loop.run_in_executor(self.store.executor, self.store.save_many,
+                                       *self.rows(pending))
+        except Exception as error:
+            # Anything but a crash of this loop, which would stop saving for good.
+            print(f"Failed to save XP for {len(pending)} users: {error!r}")
+            self.pending |= pending
+        finally:
+            self.writing = set()
+            self.flushing = None
+
+    def rows(self, keys: Iterable[Tuple[int, int]]) -> Tuple[List[Tuple[int, int, int]],
+                                                            List[Tuple[int, int, int, bytes]]]:
+        # Read on the event loop, so the batch is consistent.
+        totals = []
+        recent = []
+        for guild_id, user_id in keys:
+            totals.append((guild_id, user_id, self.guilds[guild_id][user_id]))
+            ring = self.windows[guild_id].rings.get(user_id)
+            if ring is not None:
+                recent.append((guild_id, user_id, ring[LAST_HOUR], ring.tobytes()))
+        return totals, recent
+
+    def close(self) -> None:
+        # Writes what is left once the event loop has stopped, after any
+        # write still running on the store's thread. That write's users are
+        # written again, since with the loop stopped nothing would put them
+        # back if it failed.
+        self.store.executor.shutdown()
+        keys = self.pending | self.writing
+        if keys:
+            self.store.save_many(*self.rows(keys))
+            self.pending = set()
+            self.writing = set()